@@ -0,0 +1,147 @@
+# async_clients.py
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_transport import Abort
+
+class BackgroundLoop:
+    """
+    One asyncio event loop on a daemon thread. Tk code hands it coroutines
+    with submit() and gets a concurrent.futures.Future back, which can be
+    waited on or cancel()ed from any thread.
+    """
+    def __init__(self, max_workers: int = 8):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers, thread_name_prefix="danzar-io")
+        )
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_loop() -> BackgroundLoop:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BackgroundLoop()
+        return _shared
+
+
+class _AsyncBackend:
+    """
+    Runs a sync client's blocking calls on the loop's executor, with at most
+    `limit` calls in flight against that backend.
+
+    A cancelled call can't interrupt its thread, so it keeps its slot until
+    the thread returns; `on_cancel` is how the caller makes that happen soon.
+    """
+    def __init__(self, client, limit: int = 2):
+        self.sync   = client
+        self._limit = limit
+        self._sem   = None   # created on the loop thread on first use
+
+    async def _run(self, fn, *args, on_cancel=None, **kwargs):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self._limit)
+        async with self._sem:
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if on_cancel is not None:
+                    on_cancel()
+                while not call.done():
+                    try:
+                        await asyncio.wait([call])
+                    except asyncio.CancelledError:
+                        pass
+                if not call.cancelled():
+                    call.exception()   # the aborted call's error is expected
+                raise
+
+
+class AsyncLMClient(_AsyncBackend):
+    """
+    Async LMClient. Cancelling the task closes the request's connection
+    (streamed or not, before or after the first token), which stops
+    generation. With stream=True, `on_token` is called (from a worker
+    thread) for every token.
+    """
+    async def chat(self, system_prompt: str, user_prompt: str,
+                   on_token=None, stream: bool = True, history: list = None) -> str:
+        if not stream:
+            return await self._abortable(
+                lambda abort: self.sync.chat(system_prompt, user_prompt, history, abort=abort)
+            )
+        return await self._consume(
+            lambda abort: self.sync.stream_chat(system_prompt, user_prompt, history, abort=abort),
+            on_token
+        )
+
+    async def send_screenshot_data(self, png_bytes, system_prompt: str, user_prompt: str,
+                                   on_token=None, stream: bool = True) -> str:
+        return await self.send_images_data(
+            [png_bytes], system_prompt, user_prompt, on_token, stream
+        )
+
+    async def send_images_data(self, images: list, system_prompt: str, user_prompt: str,
+                               on_token=None, stream: bool = True) -> str:
+        if not stream:
+            return await self._abortable(
+                lambda abort: self.sync.send_images_data(
+                    images, system_prompt, user_prompt, abort=abort)
+            )
+        return await self._consume(
+            lambda abort: self.sync.stream_images_data(
+                images, system_prompt, user_prompt, abort=abort),
+            on_token
+        )
+
+    async def _abortable(self, call):
+        abort = Abort()
+        return await self._run(call, abort, on_cancel=abort.abort)
+
+    async def _consume(self, make_stream, on_token):
+        def run(abort):
+            tokens, parts = make_stream(abort), []
+            try:
+                for token in tokens:
+                    if abort.aborted:
+                        break
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+            finally:
+                tokens.close()
+            return "".join(parts)
+
+        return await self._abortable(run)
+
+
+class AsyncRAGClient(_AsyncBackend):
+    async def query(self, query_text: str, top_k: int = 5) -> list[dict]:
+        return await self._run(self.sync.query, query_text, top_k)
+
+    async def add_text(self, payload: dict):
+        return await self._run(self.sync.add_text, payload)
+
+    async def add_image(self, id: str, b64_png: str, caption: str):
+        return await self._run(self.sync.add_image, id, b64_png, caption)
+
+
+class AsyncTTSClient(_AsyncBackend):
+    async def generate_wav(self, text: str) -> bytes:
+        return await self._run(self.sync.generate_wav, text)
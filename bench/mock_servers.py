@@ -0,0 +1,179 @@
+# bench/mock_servers.py
+
+import io
+import sys
+import json
+import time
+import wave
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class MockConfig:
+    """Latencies in seconds; sizes in tokens/words/items/seconds of audio."""
+    lm_prefill:    float = 0.05     # before the first token
+    lm_per_image:  float = 0.02     # extra prefill per attached image
+    lm_token:      float = 0.005    # between streamed tokens
+    reply_tokens:  int   = 60
+    rag_latency:   float = 0.01
+    rag_sources:   int   = 5
+    rag_text_len:  int   = 200
+    tts_latency:   float = 0.05
+    tts_seconds:   float = 1.0      # length of the returned (silent) WAV
+    tts_rate:      int   = 22050
+
+
+def _wav(seconds: float, rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Stand-ins for the LAN services:
+      GET  /v1/models
+      POST /v1/chat/completions   (OpenAI-style JSON or SSE with "stream": true)
+      POST /add, /add_bulk, /query (RAG server)
+      POST /tts                    (WAV bytes)
+    """
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real servers
+    disable_nagle_algorithm = True  # else headers/body writes add ~40 ms (delayed ACK)
+
+    @property
+    def cfg(self) -> MockConfig:
+        return self.server.mock_config
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status: int, data: bytes, ctype: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, obj, status: int = 200):
+        self._send(status, json.dumps(obj).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/v1/models"):
+            self._json({"data": [{"id": "mock-model"}]})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self._body()
+        self.server.count(self.path)
+        if self.path.endswith("/chat/completions"):
+            self._chat(body)
+        elif self.path in ("/add", "/add_bulk"):
+            time.sleep(self.cfg.rag_latency)
+            self._json({"added": len(body.get("items", [body]))})
+        elif self.path == "/query":
+            time.sleep(self.cfg.rag_latency)
+            text = ("lorem ipsum " * (self.cfg.rag_text_len // 12 + 1))[:self.cfg.rag_text_len]
+            self._json({"sources": [
+                {"text": f"{i}: {text}", "type": "wiki", "score": 1.0 - i / 10}
+                for i in range(self.cfg.rag_sources)
+            ]})
+        elif self.path == "/tts":
+            time.sleep(self.cfg.tts_latency)
+            self._send(200, self.server.wav, "audio/wav")
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def _chat(self, body: dict):
+        images, prompt = len(body.get("images", [])), ""
+        for m in body.get("messages", []):
+            content = m.get("content")
+            if isinstance(content, list):
+                images += sum(1 for p in content if p.get("type") == "image_url")
+                content = " ".join(p.get("text", "") for p in content)
+            prompt += content or ""
+        time.sleep(self.cfg.lm_prefill + images * self.cfg.lm_per_image)
+        if images > 1 and "'Frame 1:'" in prompt:
+            # LMClient.describe_frames(per_frame=True) asks for one line per frame
+            per = max(2, self.cfg.reply_tokens // images)
+            tokens = [t for i in range(images) for t in
+                      [f"Frame {i + 1}: "] + [f"word{k} " for k in range(per - 2)] + ["done.\n"]]
+        else:
+            tokens = [f"word{i} " for i in range(self.cfg.reply_tokens - 1)] + ["done."]
+
+        if not body.get("stream"):
+            time.sleep(self.cfg.lm_token * len(tokens))
+            self._json({"choices": [{"message": {"role": "assistant",
+                                                 "content": "".join(tokens)}}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                chunk = json.dumps({"choices": [{"delta": {"content": token}}]})
+                self._chunk(f"data: {chunk}\n\n".encode("utf-8"))
+                time.sleep(self.cfg.lm_token)
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # client closed the stream early (cancellation)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig, port: int = 0):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.mock_config = config
+        self.wav         = _wav(config.tts_seconds, config.tts_rate)
+        self.requests    = {}
+        self._lock       = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # clients dropping pooled keep-alive connections is normal here
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def start_mock_server(config: MockConfig = None, port: int = 0) -> MockServer:
+    """Start all mock endpoints on one local port (a daemon thread)."""
+    server = MockServer(config or MockConfig(), port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Serve mock LM/RAG/TTS endpoints")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    srv = start_mock_server(port=args.port)
+    print(f"mock servers on {srv.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,276 @@
+# bench/run_bench.py
+"""
+Offline benchmarks: drives the real LM/RAG/TTS clients and the commentary
+and batch pipelines against local mock servers, with synthetic frames.
+
+    python -m bench.run_bench                       # everything, 1080p + 4K
+    python -m bench.run_bench --only encode lm --frames 50 --json out.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from bench.mock_servers import MockConfig, start_mock_server
+from http_transport import configure_transport
+from metrics import Histogram
+from frame_gate import FrameChangeGate
+from image_encoder import ImageEncoder
+from lm_client import LMClient
+from rag_client import RAGClient
+from tts_client import TTSClient
+from prompt_builder import PromptAssembler
+from vision_cache import dhash, hamming
+from tts_pipeline import split_sentences
+
+RESOLUTIONS = {"1080p": (1080, 1920), "1440p": (1440, 2560), "4k": (2160, 3840)}
+
+SCENARIOS = ("encode", "lm", "rag", "tts", "commentary", "batch")
+
+
+def synthetic_frame(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """
+    A game-UI-like BGRA frame: smooth background, flat panels and a few
+    noisy (text-like) strips. `seed` moves things slightly between frames.
+    """
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., 0] = (80 + 60 * x + 10 * np.sin(seed + 20 * y)).astype(np.uint8)
+    frame[..., 1] = (60 + 90 * y).astype(np.uint8)
+    frame[..., 2] = (40 + 50 * x * y).astype(np.uint8)
+    frame[..., 3] = 255
+    for _ in range(12):
+        h, w = rng.integers(height // 20, height // 4), rng.integers(width // 20, width // 4)
+        top, left = rng.integers(0, height - h), rng.integers(0, width - w)
+        frame[top:top + h, left:left + w, :3] = rng.integers(0, 255, 3, dtype=np.uint8)
+        strip = min(h, 24)
+        frame[top:top + strip, left:left + w, :3] = rng.integers(
+            0, 255, (strip, w, 3), dtype=np.uint8)
+    return frame
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:   # Windows
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Bench:
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.results      = []
+
+    def run(self, name: str, n: int, fn, **extra):
+        """Call fn(i) n times; record throughput and latency percentiles."""
+        hist = Histogram(window=n)
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        for i in range(n):
+            t = time.perf_counter()
+            fn(i)
+            hist.add((time.perf_counter() - t) * 1000)
+        total = time.perf_counter() - start
+        peak  = None
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        s = hist.summary()
+        row = {
+            "name":        name,
+            "n":           n,
+            "seconds":     round(total, 3),
+            "per_second":  round(n / total, 2) if total else 0.0,
+            "p50_ms":      round(s["p50"], 2),
+            "p95_ms":      round(s["p95"], 2),
+            "p99_ms":      round(s["p99"], 2),
+            "alloc_mb":    round(peak, 1) if peak is not None else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            **extra
+        }
+        self.results.append(row)
+        print(f"{name:<28} {n:>5}  {row['per_second']:>8.2f}/s  "
+              f"p50 {row['p50_ms']:>8.2f}  p95 {row['p95_ms']:>8.2f}  "
+              f"p99 {row['p99_ms']:>8.2f} ms  rss {row['peak_rss_mb']:.0f} MB"
+              + "".join(f"  {k}={v}" for k, v in extra.items()))
+        return row
+
+    def note(self, key: str, value):
+        """Attach an extra figure to the last result."""
+        self.results[-1][key] = value
+        print(f"{'':<28} {key} = {value}")
+
+
+# ─── Scenarios ────────────────────────────────────────────────────────
+
+def bench_encode(bench, frames, args):
+    for res, frs in frames.items():
+        enc = ImageEncoder()
+        sizes = []
+        bench.run(f"encode {res}", args.frames,
+                  lambda i: sizes.append(enc.encode(frs[i % len(frs)])[0].size))
+        bench.note("avg_kb", round(sum(sizes) / len(sizes) / 1024, 1))
+        bench.run(f"dhash {res}", args.frames, lambda i: dhash(frs[i % len(frs)]))
+        bench.note("gradient_vs_flat_bits", check_dhash(*RESOLUTIONS[res]))
+
+def check_dhash(height: int, width: int) -> int:
+    """
+    dhash must compare cell means: a flat grey frame has no cell brighter
+    than its neighbour (hash 0), and a faint left-to-right gradient differs.
+    """
+    flat = np.full((height, width, 4), 128, dtype=np.uint8)
+    ramp = flat.copy()
+    ramp[..., :3] = np.linspace(128, 134, width, dtype=np.float32)[None, :, None].astype(np.uint8)
+    bits = hamming(dhash(flat), dhash(ramp))
+    if dhash(flat) != 0 or bits == 0:
+        raise RuntimeError(f"dhash: flat frame hashes to {dhash(flat):#x}, "
+                           f"a 5% gradient differs by {bits} bits")
+    return bits
+
+def bench_lm(bench, frames, args, lm):
+    bench.run("lm chat", args.requests, lambda i: lm.chat("system", f"question {i}"))
+
+    ttfts = Histogram()
+    def stream(i):
+        for _ in lm.stream_chat("system", f"question {i}"):
+            pass
+        ttfts.add(lm.last_ttft * 1000)
+    bench.run("lm stream_chat", args.requests, stream)
+    bench.note("ttft_p50_ms", round(ttfts.summary()["p50"], 2))
+
+    for res, frs in frames.items():
+        images = ImageEncoder().encode(frs[0])
+        bench.run(f"lm images {res}", args.requests,
+                  lambda i: lm.send_images_data(images, "system", "describe"))
+
+def bench_rag(bench, frames, args, url):
+    cold = RAGClient(f"{url}/add", f"{url}/query", cache_size=0)
+    bench.run("rag query (no cache)", args.requests, lambda i: cold.query(f"query {i % 5}"))
+
+    warm = RAGClient(f"{url}/add", f"{url}/query")
+    bench.run("rag query (cached)", args.requests, lambda i: warm.query(f"query {i % 2}"))
+    bench.note("hit_rate", round(warm.cache_stats()["hit_rate"], 2))
+
+    # commentary-like load: notes keep landing while lookups run
+    mixed = RAGClient(f"{url}/add", f"{url}/query", bulk_url=f"{url}/add_bulk",
+                      flush_interval=0.05)
+    def ingest_and_query(i):
+        mixed.enqueue_text({"text": f"note {i}", "type": "bench"})
+        mixed.query(f"query {i % 2}")
+    bench.run("rag query + ingest", args.requests, ingest_and_query)
+    bench.note("hit_rate", round(mixed.cache_stats()["hit_rate"], 2))
+    mixed.flush(timeout=60)
+
+    for name, bulk in (("rag ingest (bulk)", f"{url}/add_bulk"), ("rag ingest (per item)", None)):
+        rag = RAGClient(f"{url}/add", f"{url}/query", bulk_url=bulk, flush_interval=0.05)
+        bench.run(name, 1, lambda i: (
+            [rag.enqueue_text({"text": f"note {k}", "type": "bench"})
+             for k in range(args.requests * 4)],
+            rag.flush(timeout=60)
+        ), items=args.requests * 4)
+
+def bench_tts(bench, frames, args, url):
+    tts = TTSClient(url)
+    bench.run("tts synth", args.requests, lambda i: tts.generate_wav(f"Sentence number {i}."))
+
+def _speak(tts, text):
+    for sentence in split_sentences(text):
+        tts.generate_wav(sentence)
+
+def bench_commentary(bench, frames, args, lm, tts):
+    """One tick: change gate → encode → streamed vision reply → TTS per sentence."""
+    for res, frs in frames.items():
+        gate, enc, sent = FrameChangeGate(threshold=3.0), ImageEncoder(), [0]
+        def tick(i):
+            frame = frs[i % len(frs)]
+            if not gate.should_send(frame):
+                return
+            text = "".join(lm.stream_images_data(enc.encode(frame), "system", "describe"))
+            gate.mark_sent()
+            _speak(tts, text)
+            sent[0] += 1
+        bench.run(f"commentary {res}", args.frames, tick)
+        bench.note("frames_sent", sent[0])
+
+def bench_batch(bench, frames, args, lm, tts):
+    """One batch: encode N frames → one multi-image request → prompt assembly → chat."""
+    prompts = PromptAssembler()
+    template = "Recent frames ({n}):\n{captures}\n{rag_context}\nGive advice."
+    for res, frs in frames.items():
+        enc = ImageEncoder()
+        def batch(i):
+            images = [img for f in frs[:args.batch] for img in enc.encode(f)]
+            descs  = lm.describe_frames(images, "system", "describe", per_frame=True)
+            system, user = prompts.build("system", template, descs)
+            _speak(tts, lm.chat(system, user))
+        bench.run(f"batch x{args.batch} {res}", max(1, args.frames // args.batch), batch)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--resolutions", nargs="+", choices=RESOLUTIONS, default=["1080p", "4k"])
+    ap.add_argument("--frames", type=int, default=20, help="frames per frame scenario")
+    ap.add_argument("--requests", type=int, default=20, help="calls per client scenario")
+    ap.add_argument("--batch", type=int, default=3, help="frames per batch")
+    ap.add_argument("--lm-prefill", type=float, default=MockConfig.lm_prefill)
+    ap.add_argument("--lm-token", type=float, default=MockConfig.lm_token)
+    ap.add_argument("--reply-tokens", type=int, default=MockConfig.reply_tokens)
+    ap.add_argument("--rag-latency", type=float, default=MockConfig.rag_latency)
+    ap.add_argument("--tts-latency", type=float, default=MockConfig.tts_latency)
+    ap.add_argument("--trace-memory", action="store_true",
+                    help="also report Python allocation peaks (slower)")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    server = start_mock_server(MockConfig(
+        lm_prefill   = args.lm_prefill,
+        lm_token     = args.lm_token,
+        reply_tokens = args.reply_tokens,
+        rag_latency  = args.rag_latency,
+        tts_latency  = args.tts_latency
+    ))
+    configure_transport(retries=0)
+    lm  = LMClient(server.url, "", "mock-model")
+    tts = TTSClient(server.url)
+
+    frames = {
+        res: [synthetic_frame(*RESOLUTIONS[res], seed=s) for s in range(4)]
+        for res in args.resolutions
+    }
+    print(f"mock servers on {server.url}; frames: "
+          + ", ".join(f"{r} {RESOLUTIONS[r][1]}x{RESOLUTIONS[r][0]}" for r in frames))
+
+    bench = Bench(args.trace_memory)
+    if "encode" in args.only:
+        bench_encode(bench, frames, args)
+    if "lm" in args.only:
+        bench_lm(bench, frames, args, lm)
+    if "rag" in args.only:
+        bench_rag(bench, frames, args, server.url)
+    if "tts" in args.only:
+        bench_tts(bench, frames, args, server.url)
+    if "commentary" in args.only:
+        bench_commentary(bench, frames, args, lm, tts)
+    if "batch" in args.only:
+        bench_batch(bench, frames, args, lm, tts)
+
+    print(f"server requests: {server.requests}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": bench.results}, f, indent=2)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
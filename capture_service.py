@@ -0,0 +1,173 @@
+# capture_service.py
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import mss
+import numpy as np
+
+from roi_capture import grab_rois
+from metrics import span
+
+class Frame:
+    """
+    A captured frame living in a FrameRing slot. `array` is a zero-copy
+    (h, w, 4) BGRA view; it stays valid until the ring wraps around to its
+    slot again (capacity - 1 later captures). Use copy() to keep it longer.
+    """
+    __slots__ = ("ring", "seq", "time", "array")
+
+    def __init__(self, ring, seq: int, t: float, array: np.ndarray):
+        self.ring  = ring
+        self.seq   = seq
+        self.time  = t
+        self.array = array
+
+    @property
+    def valid(self) -> bool:
+        return self.ring.holds(self.seq)
+
+    def copy(self) -> np.ndarray:
+        return self.array.copy()
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+
+class FrameRing:
+    """
+    Fixed-size, preallocated ring of BGRA frames with drop-oldest semantics.
+    With shared=True the ring lives in a SharedMemory block, so worker
+    processes (see EncodePool) can read frames without a copy.
+    """
+    def __init__(self, capacity: int, height: int, width: int, shared: bool = False):
+        self.shape = (height, width)
+        shape      = (capacity, height, width, 4)
+        self.shm   = None
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+            self.buf = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        else:
+            self.buf = np.empty(shape, dtype=np.uint8)
+        self.seqs  = [-1] * capacity
+        self.times = [0.0] * capacity
+        self._next = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.seqs)
+
+    def write(self, bgra, t: float) -> Frame:
+        seq  = self._next
+        slot = seq % self.capacity
+        self.seqs[slot] = -1   # mark the slot as being rewritten
+        np.copyto(self.buf[slot], np.frombuffer(bgra, dtype=np.uint8).reshape(self.buf.shape[1:]))
+        self.seqs[slot], self.times[slot] = seq, t
+        self._next += 1
+        return Frame(self, seq, t, self.buf[slot])
+
+    def offset(self, seq: int) -> int:
+        """Byte offset of a frame's slot inside the (shared) buffer."""
+        return (seq % self.capacity) * self.buf[0].nbytes
+
+    def holds(self, seq: int) -> bool:
+        return self.seqs[seq % self.capacity] == seq
+
+    def close(self):
+        """Free the shared block now (frames from this ring become invalid)."""
+        shm, self.shm = getattr(self, "shm", None), None
+        if shm is not None:
+            self.buf = None
+            for release in (shm.unlink, shm.close):
+                try:
+                    release()
+                except Exception:
+                    pass
+
+    def __del__(self):
+        # a ring replaced after a resolution change: runs once no Frame or
+        # in-flight encode references it any more
+        self.close()
+
+
+class CaptureService:
+    """
+    One long-lived capture thread that owns the only mss handle (mss handles
+    are per-thread on Windows). Full-monitor grabs land in a preallocated
+    FrameRing, so memory stays bounded however long the session runs.
+    With shared=True the ring is allocated in shared memory for
+    process-pool encoding.
+    """
+    def __init__(self, monitor_index: int = 1, capacity: int = 4, shared: bool = False):
+        self.monitor_index = monitor_index
+        self.capacity      = capacity
+        self.shared        = shared
+        self.monitors      = []
+        self._ring         = None
+        self._jobs         = queue.Queue()
+        self._ready        = threading.Event()
+
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    # ─── Consumer API (any thread) ────────────────────────────────────
+
+    def monitor(self, index: int = None) -> dict:
+        """Cached geometry of a monitor (no mss call)."""
+        return self.monitors[self.monitor_index if index is None else index]
+
+    def grab(self, monitor_index: int = None) -> Frame:
+        """Capture the monitor now; returns the new ring Frame."""
+        return self._call(lambda sct: self._capture(sct, monitor_index))
+
+    def grab_rois(self, rois: dict, monitor_index: int = None) -> list:
+        """Grab only the ROI rectangles. Returns [(name, ScreenShot), ...]."""
+        def grab(sct):
+            with span("capture", mode="roi"):
+                return grab_rois(sct, self.monitor(monitor_index), rois)
+        return self._call(grab)
+
+    def close(self):
+        """Release the frame ring (unlinks its shared memory, if any)."""
+        ring, self._ring = self._ring, None
+        if ring is not None:
+            ring.close()
+
+    def refresh_monitors(self):
+        """
+        Re-read monitor geometry, e.g. after a display change. The list is
+        updated in place, so holders of `monitors` (ROIManager) see it too.
+        """
+        self.monitors[:] = self._call(lambda sct: [dict(m) for m in sct.monitors])
+
+    # ─── Capture thread ───────────────────────────────────────────────
+
+    def _call(self, fn):
+        fut = Future()
+        self._jobs.put((fn, fut))
+        return fut.result()
+
+    def _run(self):
+        with mss.mss() as sct:
+            self.monitors = [dict(m) for m in sct.monitors]
+            self._ready.set()
+            while True:
+                fn, fut = self._jobs.get()
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    fut.set_result(fn(sct))
+                except Exception as e:
+                    fut.set_exception(e)
+
+    def _capture(self, sct, monitor_index: int = None) -> Frame:
+        with span("capture"):
+            shot = sct.grab(self.monitor(monitor_index))
+            ring = self._ring
+            if ring is None or ring.shape != (shot.height, shot.width):
+                # (re)allocate only when the monitor resolution changes
+                ring = self._ring = FrameRing(self.capacity, shot.height, shot.width, self.shared)
+            return ring.write(shot.raw, time.time())
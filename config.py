@@ -1,6 +1,6 @@
 # config.py
 
-import os, json
+import os, json, logging
 
 CONFIG_FILE = "settings.json"
 PROFILE_DIR = "profiles"
@@ -13,6 +13,51 @@ DEFAULT_SETTINGS = {
     "rag_query_url":       "http://192.168.0.24:8000/query",
     "commentary_interval": 5,
     "commentary_batch":    3,
+    "change_threshold":    3.0,
+    "capture_mode":        "full",
+    "image_encoders":      {},
+    "prompt_budgets":      {},
+    "memory_turns":        6,
+    "memory_summary_words": 200,
+    "memory_fold_lines":   12,
+    "memory_fold_age":     120,
+    "stream_responses":    True,
+    "tts_voice":           {},
+    "tts_cache_dir":       "tts_cache",
+    "tts_cache_mb":        256,
+    "http_connect_timeout": 3.05,
+    "http_retries":        2,
+    "http_pool_size":      8,
+    "lm_concurrency":      2,
+    "rag_concurrency":     2,
+    "rag_bulk_url":        "",
+    "rag_batch_size":      16,
+    "rag_flush_interval":  2.0,
+    "rag_max_pending":     256,
+    "rag_cache_size":      256,
+    "rag_cache_ttl":       120,
+    "rag_local_index":     True,
+    "rag_local_dim":       512,
+    "rag_local_min_score": 0.35,
+    "multi_image_mode":    "combined",
+    "capture_ring_size":   4,
+    "screenshot_queue_size": 10,
+    "debug_dump_path":     "",
+    "encode_processes":    2,
+    "vision_cache":        True,
+    "vision_cache_size":   512,
+    "vision_cache_ttl":    86400,
+    "vision_cache_distance": 4,
+    "cache_save_interval": 60,
+    "chat_visible_max":    200,
+    "chat_history_max":    2000,
+    "chat_log_path":       "chat_log.jsonl",
+    "ui_fps":              30,
+    "log_level":           "INFO",
+    "metrics_enabled":     True,
+    "metrics_trace_path":  "",
+    "metrics_summary_path": "",
+    "metrics_port":        0,
     "show_rois": False,
     "selected_profile":    "Default"
 }
@@ -52,6 +97,17 @@ def load_profile(name):
         "commentary": data.get("commentary", "")
     }
 
+def setup_logging(cfg):
+    # DEBUG brings back the old per-request traces
+    logging.basicConfig(
+        level  = getattr(logging, str(cfg.get("log_level", "INFO")).upper(), logging.INFO),
+        format = "%(asctime)s [%(name)s %(levelname)s] %(message)s"
+    )
+
+def profile_cache_dir(name):
+    # per-profile caches/indexes live next to the profile JSONs
+    return os.path.join(PROFILE_DIR, "cache", name)
+
 def save_profile(name, prompts):
     # prompts may include keys beyond system/screenshot/commentary
     path = os.path.join(PROFILE_DIR, f"{name}.json")
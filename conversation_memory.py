@@ -0,0 +1,139 @@
+# conversation_memory.py
+
+import time
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM = (
+    "You keep a running summary of a game-advisor session. Merge the new "
+    "events into the existing summary. Keep facts that matter later (goals, "
+    "threats, colonist and resource state, advice already given); drop "
+    "repetition. Reply with the summary only."
+)
+
+class ConversationMemory:
+    """
+    Rolling chat memory: the last `max_turns` user/assistant exchanges are
+    kept verbatim; older turns and frame descriptions (add_note) are folded
+    into a running summary by `summarize(system, user) -> str`, an LM call
+    made off the request path by fold() / fold_async().
+
+    The summary rides at the end of the system prompt, so each request
+    costs roughly the same however long the session runs, and the
+    system prompt's own text stays a stable prefix.
+
+    fold_async() only summarizes once `fold_lines` lines are pending or the
+    oldest has waited `fold_age` seconds, so the summarization call runs
+    every few ticks/turns instead of competing with each one.
+    """
+    def __init__(self, summarize, max_turns: int = 6, summary_words: int = 200,
+                 max_pending: int = 40, fold_lines: int = 12, fold_age: float = 120.0):
+        self.summarize     = summarize
+        self.max_turns     = max_turns
+        self.summary_words = summary_words
+        self.max_pending   = max_pending
+        self.fold_lines    = fold_lines
+        self.fold_age      = fold_age
+        self.summary       = ""
+        self._turns        = []    # [(user, assistant)], oldest first
+        self._pending      = []    # lines waiting to be folded into the summary
+        self._pending_since = 0.0  # monotonic time the oldest pending line arrived
+        self._trimmed      = 0     # pending lines dropped unfolded, ever
+        self._lock         = threading.Lock()
+        self._folding      = False
+        self._epoch        = 0     # bumped by clear(), so stale folds are discarded
+
+    def context(self, system_prompt: str):
+        """Returns (system_prompt + summary, history messages) for LMClient.chat."""
+        with self._lock:
+            summary, turns = self.summary, list(self._turns)
+        if summary:
+            system_prompt = f"{system_prompt}\n\nEarlier in this session:\n{summary}"
+        history = []
+        for user, assistant in turns:
+            history.append({"role": "user",      "content": user})
+            history.append({"role": "assistant", "content": assistant})
+        return system_prompt, history
+
+    def add_turn(self, user: str, assistant: str):
+        with self._lock:
+            self._turns.append((user, assistant))
+            while len(self._turns) > self.max_turns:
+                old_user, old_assistant = self._turns.pop(0)
+                self._queue(f"Player: {old_user}")
+                self._queue(f"Advisor: {old_assistant}")
+
+    def add_note(self, text: str):
+        """Something seen or said outside the chat (frame description, commentary)."""
+        if text:
+            with self._lock:
+                self._queue(text)
+
+    def _queue(self, line: str):
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(" ".join(line.split()))
+        # oldest notes go if folding falls behind
+        excess = len(self._pending) - self.max_pending
+        if excess > 0:
+            del self._pending[:excess]
+            self._trimmed += excess
+
+    def fold(self) -> bool:
+        """Fold pending turns/notes into the summary now (blocking LM call)."""
+        with self._lock:
+            if self._folding or not self._pending:
+                return False
+            self._folding = True
+        return self._fold()
+
+    def _due(self) -> bool:
+        # caller holds _lock
+        return bool(self._pending) and (
+            len(self._pending) >= self.fold_lines
+            or time.monotonic() - self._pending_since >= self.fold_age
+        )
+
+    def _fold(self) -> bool:
+        # caller has set _folding under _lock
+        with self._lock:
+            summary, lines = self.summary, list(self._pending)
+            trimmed, epoch = self._trimmed, self._epoch
+        new_summary = None
+        try:
+            user = (
+                f"Current summary:\n{summary or '(none yet)'}\n\n"
+                "New events:\n" + "\n".join(f"- {l}" for l in lines) +
+                f"\n\nWrite the updated summary in at most {self.summary_words} words."
+            )
+            new_summary = self.summarize(SUMMARY_SYSTEM, user).strip()
+        except Exception as e:
+            log.warning("summarize failed: %s", e)
+        finally:
+            with self._lock:
+                self._folding = False
+                if new_summary and epoch == self._epoch:
+                    self.summary = new_summary
+                    # notes that arrived while we were summarizing stay pending
+                    del self._pending[:max(0, len(lines) - (self._trimmed - trimmed))]
+                    self._pending_since = time.monotonic()
+        return bool(new_summary)
+
+    def fold_async(self) -> bool:
+        """
+        fold() on a daemon thread once enough is pending (see fold_lines /
+        fold_age); a no-op otherwise or while a fold is running.
+        """
+        with self._lock:
+            if self._folding or not self._due():
+                return False
+            self._folding = True
+        threading.Thread(target=self._fold, daemon=True).start()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self.summary, self._turns, self._pending = "", [], []
+            self._epoch += 1
@@ -1,25 +1,34 @@
 #!/usr/bin/env python3
 import sys
 import os
-import queue
-import base64
+import threading
+from collections import deque
+import logging
 import keyboard
-import simpleaudio as sa
 import tkinter as tk
-import requests                    # ← for /v1/models check
-import mss
-from mss.tools import to_png
 from uuid import uuid4
-from PIL import Image
 
-from config         import load_settings, save_settings
+from config         import load_settings, save_settings, profile_cache_dir, setup_logging
+from http_transport import transport_from_settings
+from metrics        import metrics_from_settings
 from lm_client      import LMClient
 from rag_client     import RAGClient
+from local_index    import LocalIndex
 from tts_client     import TTSClient
+from tts_cache      import TTSCache
+from tts_pipeline   import SpeechPipeline
+from prompt_builder import PromptAssembler
+from conversation_memory import ConversationMemory
 from ui.widgets     import add_bubble
+from ui.dispatcher  import UIDispatcher
 from ui.frames      import build_config_frame, build_preview_frame, build_chat_frame
-from ui.preview     import PreviewCanvas
+from ui.preview     import PreviewCanvas, make_thumbnail
 from ui.roi_manager import ROIManager
+from roi_capture    import build_mosaic
+from image_encoder  import ImageEncoder, to_pil
+from capture_service import CaptureService
+
+log = logging.getLogger(__name__)
 
 class DanzarAIApp(tk.Tk):
     def __init__(self):
@@ -29,16 +38,28 @@ class DanzarAIApp(tk.Tk):
 
         # Load settings + profile
         self.cfg = load_settings()
-        print(f"🛠 [DEBUG] Loaded settings.json, model_name = '{self.cfg.get('model_name')}'")
+        setup_logging(self.cfg)
+        log.debug("Loaded settings.json, model_name = %r", self.cfg.get("model_name"))
+        self.metrics = metrics_from_settings(self.cfg)
+        # Worker threads hand all widget updates to the Tk thread through this
+        self.ui = UIDispatcher(self, fps=self.cfg.get("ui_fps", 30))
+
+        # One pooled HTTP transport shared by the LM, RAG and TTS clients
+        self.http = transport_from_settings(self.cfg)
 
         # Check what LM Studio knows about your models
         try:
-            resp = requests.get(f"{self.cfg['lmstudio_url'].rstrip('/')}/v1/models")
+            resp = self.http.get(f"{self.cfg['lmstudio_url'].rstrip('/')}/v1/models", timeout=5)
             data = resp.json()
             available = [m['id'] for m in data.get('data', [])]
-            print("🛠 [DEBUG] LM Studio registered models:", available)
+            log.info("LM Studio registered models: %s", available)
         except Exception as e:
-            print("🛠 [DEBUG] Error fetching /v1/models:", e)
+            log.warning("Error fetching /v1/models: %s", e)
+
+        # One long-lived capture thread (sole mss handle) + preallocated frame ring
+        self.capture = CaptureService(
+            self.cfg.get("monitor_index", 1), capacity=self.cfg["capture_ring_size"]
+        )
 
         (self.config_canvas,
          self.config_frame,
@@ -51,7 +72,8 @@ class DanzarAIApp(tk.Tk):
         self.preview = PreviewCanvas(self.preview_canvas, self)
         self.roi_mgr = ROIManager(
             self.preview_canvas,
-            self.profile_data.get("ocr_rois", {})
+            self.profile_data.get("ocr_rois", {}),
+            monitors=self.capture.monitors
         )
 
         # Chat + toolbar
@@ -78,18 +100,52 @@ class DanzarAIApp(tk.Tk):
         )
         self.rag = RAGClient(
             self.cfg["rag_add_url"],
-            self.cfg["rag_query_url"]
+            self.cfg["rag_query_url"],
+            bulk_url        = self.cfg.get("rag_bulk_url") or None,
+            batch_size      = self.cfg["rag_batch_size"],
+            flush_interval  = self.cfg["rag_flush_interval"],
+            max_pending     = self.cfg["rag_max_pending"],
+            cache_size      = self.cfg["rag_cache_size"],
+            cache_ttl       = self.cfg["rag_cache_ttl"],
+            local_index     = LocalIndex(
+                os.path.join(profile_cache_dir(self.cfg["selected_profile"]), "rag_index"),
+                dim = self.cfg["rag_local_dim"]
+            ) if self.cfg["rag_local_index"] else None,
+            local_min_score = self.cfg["rag_local_min_score"]
+        )
+        self.tts = TTSClient(
+            self.cfg["tts_server_url"],
+            voice = self.cfg.get("tts_voice"),
+            cache = TTSCache(
+                self.cfg["tts_cache_dir"],
+                max_disk_bytes=self.cfg["tts_cache_mb"] * 1024 * 1024
+            )
+        )
+        self.speech = SpeechPipeline(self.tts)
+        self.encoder = ImageEncoder.for_model(
+            self.cfg["model_name"], self.cfg.get("image_encoders")
+        )
+        self.prompts = PromptAssembler.for_model(
+            self.cfg["model_name"], self.cfg.get("prompt_budgets")
+        )
+        self.memory = ConversationMemory(
+            self.lm.chat,
+            max_turns     = self.cfg["memory_turns"],
+            summary_words = self.cfg["memory_summary_words"],
+            fold_lines    = self.cfg["memory_fold_lines"],
+            fold_age      = self.cfg["memory_fold_age"]
         )
-        self.tts = TTSClient(self.cfg["tts_server_url"])
 
         # Internal state
         self.commentary_enabled = False
         self.batch_size         = self.profile_data.get("commentary_batch", 3)
-        self.screenshot_queue   = queue.Queue()
+        # bounded, drop-oldest: encoded frames waiting for a batch
+        self.screenshot_queue   = deque(maxlen=self.cfg["screenshot_queue_size"])
 
-        # Hotkeys for screenshots & commentary
-        keyboard.add_hotkey('ctrl+f2', self._take_screenshot)
-        keyboard.add_hotkey('ctrl+f3', self._toggle_commentary)
+        # Hotkeys for screenshots & commentary (handlers that read Tk state
+        # run on the Tk thread; the batch call blocks, so it stays off it)
+        keyboard.add_hotkey('ctrl+f2', lambda: self.ui.post(self._take_screenshot))
+        keyboard.add_hotkey('ctrl+f3', lambda: self.ui.post(self._toggle_commentary))
         keyboard.add_hotkey('ctrl+f4', self._run_batch)
 
         # Clean shutdown
@@ -104,21 +160,42 @@ class DanzarAIApp(tk.Tk):
         self._chat_exchange([], prompt=text)
 
     def _take_screenshot(self):
+        # Read Tk state here; grab/convert/encode happen off the Tk thread
         m_index = self.monitor_var.get()
-        with mss.mss() as sct:
-            shot = sct.grab(sct.monitors[m_index])
-            raw_png = to_png(shot.rgb, shot.size)
-            img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
-            img.save("test.png")
+        threading.Thread(target=self._capture_and_send, args=(m_index,), daemon=True).start()
 
-            # Preview display
-            pil_img = Image.frombytes('RGB', shot.size, shot.rgb)
-            self.preview.show_image(pil_img)
+    def _capture_and_send(self, m_index):
+        """
+        One conversion per grab: the ring's BGRA buffer is wrapped once as an
+        RGB PIL image, and the preview thumbnail, the upload and the optional
+        debug dump are all derived from that single image.
+        """
+        rois = self.profile_data.get("ocr_rois", {})
+        crops = []
+        if self.cfg.get("capture_mode", "full") != "full" and rois:
+            crops = self.capture.grab_rois(rois, m_index)
+
+        if crops:
+            # ROI modes: one stitched mosaic per capture keeps the queue 1:1
+            img = build_mosaic(crops)
+            encoded = self.encoder.encode(img, allow_tiles=False)
+        else:
+            img = to_pil(self.capture.grab(m_index).array)
+            encoded = self.encoder.encode(img)
+
+        # Preview display (Tk work is handed back to the main loop)
+        thumb = make_thumbnail(img, self.preview.box)
+        self.ui.post(self.preview.show_image, thumb, key="preview")
+
+        # Opt-in debug dump, written in the background
+        dump_path = self.cfg.get("debug_dump_path")
+        if dump_path:
+            threading.Thread(target=img.save, args=(dump_path,), daemon=True).start()
 
-            # Queue & send
-            self.screenshot_queue.put(raw_png)
-            if not self.commentary_enabled:
-                self._chat_exchange([raw_png])
+        # Queue & send
+        self.screenshot_queue.extend(encoded)
+        if not self.commentary_enabled:
+            self._chat_exchange(encoded)
 
     def _toggle_commentary(self):
         self.commentary_enabled = not self.commentary_enabled
@@ -127,15 +204,15 @@ class DanzarAIApp(tk.Tk):
 
     def _run_batch(self):
         imgs = []
-        while not self.screenshot_queue.empty() and len(imgs) < self.batch_size:
-            imgs.append(self.screenshot_queue.get())
+        while self.screenshot_queue and len(imgs) < self.batch_size:
+            imgs.append(self.screenshot_queue.popleft())
         if imgs:
             self._chat_exchange(imgs)
 
     def _chat_exchange(self, images, prompt=None):
         """
-        Routes screenshot inputs through send_screenshot_data (with deep debug)
-        and text-only via chat().
+        Routes screenshot inputs through describe_frames (all frames in one
+        request, with deep debug) and text-only via chat().
         """
         # Determine prompts
         if images:
@@ -153,41 +230,67 @@ class DanzarAIApp(tk.Tk):
                 "You are a helpful game commentary assistant."
             )
             user_p = prompt or ""
+        question = user_p
 
-        # Optional RAG ingest/query
-        try:
-            self.rag.add_and_query({"prompt": user_p, "images": images})
-        except Exception:
-            pass
+        # RAG: the prompt is queued for ingestion (write-behind) and only
+        # the lookup runs inline; a failed lookup just means no extra notes
+        if user_p and not images:
+            try:
+                hits = self.rag.add_and_query({"text": user_p, "type": "prompt"})
+            except Exception as e:
+                log.warning("RAG add_and_query failed: %s", e)
+                hits = []
+            # notes go in the user turn so the system prompt stays a
+            # byte-identical (cacheable) prefix
+            _, notes = self.prompts.build(system_p, "{rag_context}", rag=hits)
+            user_p = f"{notes}\n\n{user_p}".strip()
 
         if images:
-            replies = []
-            for png in images:
-                # --- DEBUG LOGGING ---
-                b64 = base64.b64encode(png).decode("utf-8")
-                print("🔍 [DEBUG] Preparing to send_screenshot_data:")
-                print("    system_p:", system_p)
-                print("    user_p:", user_p)
-                print("    image data length:", len(b64))
-                print("    base64 prefix:", b64[:200])
-                # --- end debug ---
-
-                reply = self.lm.send_screenshot_data(png, system_p, user_p)
-                replies.append(reply)
-            response = "\n\n".join(replies)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("describe_frames: system_p=%r user_p=%r", system_p, user_p)
+                for img in images:
+                    log.debug("  image: %dx%d %s, %d bytes, encoded in %.1f ms",
+                              img.width, img.height, img.mime_type, img.size, img.encode_ms)
+
+            # all frames go out in one request (one prompt prefill)
+            if self.cfg.get("multi_image_mode", "combined") == "per_frame":
+                replies = self.lm.describe_frames(images, system_p, user_p, per_frame=True)
+                response = "\n\n".join(
+                    f"Frame {i+1}: {r}" for i, r in enumerate(replies)
+                ) if len(replies) > 1 else replies[0]
+            else:
+                response = self.lm.describe_frames(images, system_p, user_p)
         else:
-            response = self.lm.chat(system_p, user_p)
+            system_p, history = self.memory.context(system_p)
+            response = self.lm.chat(system_p, user_p, history)
 
         # Display and speak
         add_bubble(self.bubble_frame, response, is_user=False)
-        wav = self.tts.generate_wav(response)
-        sa.play_buffer(wav, 1, 2, 22050)
+        self.speech.say(response)
+        self.rag.enqueue_text({
+            "text": response,
+            "type": "screenshot" if images else "commentary"
+        })
+        if images:
+            self.memory.add_note(f"Screen: {response}")
+        else:
+            self.memory.add_turn(question, response)
+        self.memory.fold_async()
 
     def _on_close(self):
         # Save GUI state
         self.cfg["monitor_index"]    = self.monitor_var.get()
         self.cfg["selected_profile"] = self.profile_var.get()
         save_settings(self.cfg)
+        self.ui.stop()
+        self.bubble_frame.close()
+        self.rag.flush(timeout=5)
+        if self.rag.local_index is not None:
+            self.rag.local_index.save()
+        if self.cfg.get("metrics_summary_path"):
+            self.metrics.write_jsonl(self.cfg["metrics_summary_path"])
+        self.metrics.close()
+        self.capture.close()
         self.destroy()
 
 def main():
@@ -0,0 +1,143 @@
+# encode_pool.py
+
+import os
+import time
+import base64
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from image_encoder import ImageEncoder
+from metrics import observe
+
+log = logging.getLogger(__name__)
+
+# ─── Worker side (runs in the pool processes) ─────────────────────────
+
+def _encode_job(shm_name: str, offset: int, shape: tuple, settings: dict, allow_tiles: bool):
+    """
+    Resize + compress + base64 one frame straight out of shared memory. The
+    mapping is only held for the job, so a replaced ring or a closed pool
+    leaves no handles behind in the workers.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        out  = ImageEncoder(settings).encode(view, allow_tiles)
+        del view
+    finally:
+        shm.close()
+    for img in out:
+        img.b64 = base64.b64encode(img.data).decode()
+    return out
+
+
+# ─── Parent side ──────────────────────────────────────────────────────
+
+def _as_array(frame) -> np.ndarray:
+    if hasattr(frame, "raw"):   # mss ScreenShot
+        return np.frombuffer(frame.raw, dtype=np.uint8).reshape(frame.height, frame.width, 4)
+    return np.asarray(frame)     # ndarray, ring Frame or PIL image
+
+
+class EncodePool:
+    """
+    ImageEncoder-compatible front end that runs resize/compress/base64 in
+    worker processes, so multi-megabyte frames never hold this process's GIL.
+
+    Frames from a shared-memory capture ring (CaptureService(shared=True))
+    are handed over by name and offset with no copy at all. Anything else is
+    copied once into one of `slots` shared staging buffers; `slots` is also
+    the maximum queue depth, so callers block instead of piling up frames.
+    """
+    def __init__(self, settings: dict, processes: int = None, slots: int = 4):
+        self.settings   = dict(settings)
+        self.processes  = processes or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._pool      = ProcessPoolExecutor(max_workers=self.processes)
+        self._free      = deque()              # staging SharedMemory blocks
+        self._slots     = threading.BoundedSemaphore(slots)
+        self._max_slots = slots
+        self._lock      = threading.Lock()
+        self._inflight  = 0
+        self._done      = deque(maxlen=64)     # completion timestamps
+        self.last_stats = None
+
+    def encode(self, frame, allow_tiles: bool = True) -> list:
+        return self.submit(frame, allow_tiles).result()
+
+    def submit(self, frame, allow_tiles: bool = True):
+        """Returns a Future of [EncodedImage, ...] with .b64 already filled in."""
+        ring = getattr(frame, "ring", None)
+        if ring is not None and getattr(ring, "shm", None) is not None:
+            return self._track(
+                self._pool.submit(_encode_job, ring.shm.name, ring.offset(frame.seq),
+                                  frame.array.shape, self.settings, allow_tiles),
+                release=None, frame=frame
+            )
+
+        arr = _as_array(frame)
+        self._slots.acquire()    # backpressure: at most `slots` frames queued
+        shm = self._stage(arr)
+        return self._track(
+            self._pool.submit(_encode_job, shm.name, 0, arr.shape, self.settings, allow_tiles),
+            release=shm, frame=None
+        )
+
+    def _stage(self, arr: np.ndarray):
+        with self._lock:
+            shm = self._free.popleft() if self._free else None
+        if shm is None or shm.size < arr.nbytes:
+            if shm is not None:
+                shm.close(); shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+        np.copyto(np.ndarray(arr.shape, dtype=np.uint8, buffer=shm.buf), arr)
+        return shm
+
+    def _track(self, fut, release, frame):
+        start = time.perf_counter()
+        with self._lock:
+            self._inflight += 1
+
+        def done(f):
+            now = time.perf_counter()
+            # queueing + worker time, as seen by the caller
+            observe("encode", (now - start) * 1000, pool=True)
+            with self._lock:
+                self._inflight -= 1
+                self._done.append(now)
+                if release is not None:
+                    self._free.append(release)
+            if release is not None:
+                self._slots.release()
+            if frame is not None and not frame.valid and not f.exception():
+                log.warning("ring slot was overwritten while encoding")
+            if log.isEnabledFor(logging.DEBUG):
+                s = self.stats()
+                log.debug("%.1f frames/s, queue %d", s["fps"], s["queue_depth"])
+
+        fut.add_done_callback(done)
+        return fut
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = list(self._done)
+            depth = self._inflight
+        fps = (len(done) - 1) / (done[-1] - done[0]) if len(done) > 1 and done[-1] > done[0] else 0.0
+        self.last_stats = {
+            "fps":         fps,
+            "queue_depth": depth,
+            "max_slots":   self._max_slots,
+            "processes":   self.processes
+        }
+        return self.last_stats
+
+    def close(self):
+        # wait for running jobs, so no worker still maps a block we unlink
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        while self._free:
+            shm = self._free.popleft()
+            shm.close(); shm.unlink()
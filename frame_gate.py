@@ -0,0 +1,78 @@
+# frame_gate.py
+
+import numpy as np
+
+THUMB_WIDTH = 96   # width of the grayscale thumbnail we compare, in px
+
+def gray_thumbnail(frame, width: int = THUMB_WIDTH) -> np.ndarray:
+    """
+    Downsample a frame to a small float32 grayscale array.
+
+    `frame` may be an mss ScreenShot (BGRA bytes) or a NumPy array of
+    shape (h, w, 3|4). Sampling is strided, so a 4K frame never gets
+    copied at full resolution.
+    """
+    if hasattr(frame, "bgra"):
+        arr = np.frombuffer(frame.bgra, dtype=np.uint8)
+        arr = arr.reshape(frame.height, frame.width, 4)
+        bgr = True
+    else:
+        arr = np.asarray(frame)
+        bgr = arr.shape[2] == 4
+
+    step  = max(1, arr.shape[1] // width)
+    small = arr[::step, ::step, :3].astype(np.float32)
+    if bgr:
+        b, g, r = small[..., 0], small[..., 1], small[..., 2]
+    else:
+        r, g, b = small[..., 0], small[..., 1], small[..., 2]
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+
+class FrameChangeGate:
+    """
+    Skips frames that barely differ from the last one we actually sent.
+
+    The score is the mean absolute difference (0–255) between grayscale
+    thumbnails. A threshold of 0 disables the gate. should_send() also
+    accepts a list of frames (e.g. ROI crops), which are compared together.
+
+    When frames are sent asynchronously, keep `last_token` from the
+    should_send() call and pass it to mark_sent() once that frame's send
+    succeeds; a late reply for an older frame never replaces a newer
+    baseline.
+    """
+    def __init__(self, threshold: float = 0.0, width: int = THUMB_WIDTH):
+        self.threshold  = threshold
+        self.width      = width
+        self.last_score = None
+        self.last_token = None   # (seq, thumbnail) of the last should_send() frame
+        self._sent      = None   # (seq, thumbnail) of the baseline
+        self._seq       = 0
+
+    def should_send(self, frame) -> bool:
+        if isinstance(frame, (list, tuple)):
+            thumb = np.concatenate([gray_thumbnail(f, self.width).ravel() for f in frame])
+        else:
+            thumb = gray_thumbnail(frame, self.width)
+        self._seq += 1
+        self.last_token = (self._seq, thumb)
+        sent = self._sent[1] if self._sent is not None else None
+        if sent is None or sent.shape != thumb.shape:
+            self.last_score = None
+            return True
+        self.last_score = float(np.abs(thumb - sent).mean())
+        return self.threshold <= 0 or self.last_score >= self.threshold
+
+    def mark_sent(self, token=None):
+        """
+        Make a frame the baseline: the one `token` (a last_token value)
+        refers to, or by default the frame from the last should_send().
+        """
+        token = token or self.last_token
+        if token is not None and (self._sent is None or token[0] > self._sent[0]):
+            self._sent = token
+
+    def reset(self):
+        self._sent = self.last_token = None
+        self.last_score = None
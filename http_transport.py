@@ -0,0 +1,219 @@
+# http_transport.py
+
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from metrics import span
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES     = {502, 503, 504}
+
+_current = threading.local()   # .abort: the Abort of the request this thread sends
+
+
+class Abort:
+    """
+    Lets another thread stop a request in flight. abort() shuts down the
+    request's socket, so the sending thread's blocked read (waiting for the
+    headers during prefill, or for the next streamed chunk) fails at once
+    and the server sees the connection close.
+    """
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._conn   = None
+        self.aborted = False
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            conn = self._conn
+        _shutdown(conn)
+
+    def detach(self):
+        """The response is finished with; its connection may be reused."""
+        with self._lock:
+            self._conn = None
+
+    def _attach(self, conn):
+        with self._lock:
+            self._conn = conn
+            aborted    = self.aborted
+        if aborted:
+            _shutdown(conn)
+
+
+def _shutdown(conn):
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _AbortableHTTPConnection(HTTPConnection):
+    def request(self, *args, **kwargs):
+        abort = getattr(_current, "abort", None)
+        if abort is not None:
+            abort._attach(self)
+        return super().request(*args, **kwargs)
+
+class _AbortableHTTPSConnection(HTTPSConnection):
+    def request(self, *args, **kwargs):
+        abort = getattr(_current, "abort", None)
+        if abort is not None:
+            abort._attach(self)
+        return super().request(*args, **kwargs)
+
+class _HTTPPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+class _HTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+
+class HTTPTransport:
+    """
+    One pooled, keep-alive requests.Session shared by the LM, RAG and TTS
+    clients. Every call gets a (connect, read) timeout; idempotent calls
+    are retried with jittered exponential backoff.
+
+    `pool_hosts` is how many hosts get their own connection pool (one per
+    LAN service); `pool_size` is how many keep-alive connections each holds.
+    """
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 30,
+                 retries: int = 2, backoff: float = 0.25, pool_size: int = 8,
+                 pool_hosts: int = 4):
+        self.connect_timeout = connect_timeout
+        self.read_timeout    = read_timeout
+        self.retries         = retries
+        self.backoff         = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size,
+                              max_retries=0)
+        # connections register with the sending thread's Abort, if any
+        adapter.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+        self.session.mount("http://",  adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock    = threading.Lock()
+        self._retried = 0
+        self._failed  = 0
+
+    def request(self, method: str, url: str, timeout: float = None,
+                idempotent: bool = None, retry_connect: bool = False,
+                abort: Abort = None, **kwargs) -> requests.Response:
+        """
+        `timeout` is the read timeout; the connect timeout is shared.
+        POSTs are only retried when the caller passes idempotent=True, or
+        with retry_connect=True only when the connection could not be
+        opened (the request never reached the server).
+
+        With `abort`, abort.abort() from another thread fails the request
+        (or the stream of its response) with a ConnectionError. With
+        stream=True, call abort.detach() before closing the response.
+        """
+        method   = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.retries if idempotent or retry_connect else 0)
+        timeout  = (self.connect_timeout, timeout or self.read_timeout)
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            if abort is not None and abort.aborted:
+                raise requests.ConnectionError(f"{method} {url} aborted")
+            _current.abort = abort
+            try:
+                with span("http_send", method=method, url=url):
+                    resp = self.session.request(method, url, timeout=timeout, **kwargs)
+                if abort is not None and not kwargs.get("stream"):
+                    abort.detach()   # body read, connection back in the pool
+                if last or not idempotent or resp.status_code not in RETRY_STATUSES:
+                    return resp
+                resp.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last or not (idempotent or _not_sent(e)) or (abort is not None and abort.aborted):
+                    with self._lock:
+                        self._failed += 1
+                    raise
+            finally:
+                _current.abort = None
+            with self._lock:
+                self._retried += 1
+            time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Per-host connection reuse, from the urllib3 pools: how many requests
+        went out vs how many TCP connections had to be opened for them.
+        """
+        hosts = {}
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                reqs, conns = pool.num_requests, pool.num_connections
+                hosts[f"{pool.host}:{pool.port}"] = {
+                    "requests":    reqs,
+                    "connections": conns,
+                    "reuse_ratio": 1 - conns / reqs if reqs else 0.0
+                }
+        with self._lock:
+            return {"hosts": hosts, "retries": self._retried, "failures": self._failed}
+
+
+def _not_sent(exc) -> bool:
+    """True when the connection was never opened (connect timeout, refused)."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0] if exc.args else None, "reason", None)
+    return isinstance(reason, NewConnectionError)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def configure_transport(**kwargs) -> HTTPTransport:
+    """(Re)build the shared transport, e.g. from settings.json values."""
+    global _shared
+    with _shared_lock:
+        _shared = HTTPTransport(**kwargs)
+        return _shared
+
+def get_transport() -> HTTPTransport:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPTransport()
+        return _shared
+
+def transport_from_settings(cfg: dict) -> HTTPTransport:
+    # one pool per distinct service host (LM, TTS, RAG, …)
+    hosts = {urlsplit(cfg[k]).netloc for k in
+             ("lmstudio_url", "tts_server_url", "rag_add_url", "rag_query_url", "rag_bulk_url")
+             if cfg.get(k)}
+    return configure_transport(
+        connect_timeout = cfg.get("http_connect_timeout", 3.05),
+        retries         = cfg.get("http_retries", 2),
+        pool_size       = cfg.get("http_pool_size", 8),
+        pool_hosts      = max(1, len(hosts))
+    )
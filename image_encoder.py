@@ -0,0 +1,136 @@
+# image_encoder.py
+
+import io
+import math
+import time
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from metrics import observe
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ENCODER = {
+    "max_side":  1024,     # longest side after resize, in px
+    "format":    "JPEG",   # JPEG | WEBP | PNG
+    "quality":   85,       # JPEG/WebP quality
+    "png_level": 1,        # zlib level for PNG (1 = fast)
+    "tile":      None      # [cols, rows] to split the frame instead of one image
+}
+
+# Built-in per-model defaults, matched as a substring of model_name.
+# settings.json "image_encoders" (keyed by exact model_name) overrides these.
+MODEL_ENCODERS = {
+    "gemma-3":    {"max_side": 896},
+    "qwen2.5-vl": {"max_side": 1280},
+    "llava":      {"max_side": 672},
+}
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+@dataclass
+class EncodedImage:
+    data:      bytes
+    mime_type: str
+    width:     int
+    height:    int
+    encode_ms: float
+    b64:       str = None   # filled in when base64 was done off-process
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def to_pil(frame) -> Image.Image:
+    """
+    Wrap a frame as an RGB PIL image. Accepts a PIL image, an mss
+    ScreenShot, or a NumPy array (BGRA if 4 channels, else RGB).
+    """
+    if isinstance(frame, Image.Image):
+        return frame if frame.mode == "RGB" else frame.convert("RGB")
+    if hasattr(frame, "bgra"):
+        return Image.frombytes("RGB", frame.size, frame.bgra, "raw", "BGRX")
+    arr = np.ascontiguousarray(frame)
+    h, w = arr.shape[:2]
+    if arr.shape[2] == 4:
+        return Image.frombuffer("RGB", (w, h), arr, "raw", "BGRX", 0, 1)
+    return Image.frombuffer("RGB", (w, h), arr, "raw", "RGB", 0, 1)
+
+
+class ImageEncoder:
+    """
+    Resizes (or tiles) frames to the vision model's input resolution and
+    compresses them, instead of shipping a lossless full-res PNG.
+    """
+    def __init__(self, settings: dict = None):
+        self.settings = {**DEFAULT_ENCODER, **(settings or {})}
+        self.settings["format"] = self.settings["format"].upper()
+        self.last_stats = None
+
+    @classmethod
+    def for_model(cls, model_name: str, overrides: dict = None):
+        settings = {}
+        name = (model_name or "").lower()
+        for key, preset in MODEL_ENCODERS.items():
+            if key in name:
+                settings.update(preset)
+                break
+        settings.update((overrides or {}).get(model_name, {}))
+        return cls(settings)
+
+    def encode(self, frame, allow_tiles: bool = True) -> list[EncodedImage]:
+        """Encode one frame. Returns one image, or one per tile."""
+        start = time.perf_counter()
+        img   = to_pil(frame)
+        tile  = self.settings["tile"]
+        if allow_tiles and tile:
+            out = [self._encode_one(t) for t in self._tiles(img, *tile)]
+        else:
+            out = [self._encode_one(img)]
+
+        total_ms = (time.perf_counter() - start) * 1000
+        self.last_stats = {
+            "src":    img.size,
+            "images": len(out),
+            "bytes":  sum(e.size for e in out),
+            "ms":     total_ms
+        }
+        observe("encode", total_ms)
+        log.debug("%dx%d → %d× %dx%d %s: %.1f KB in %.1f ms",
+                  img.size[0], img.size[1], len(out), out[0].width, out[0].height,
+                  self.settings["format"], self.last_stats["bytes"] / 1024, total_ms)
+        return out
+
+    def _tiles(self, img: Image.Image, cols: int, rows: int):
+        tw, th = math.ceil(img.width / cols), math.ceil(img.height / rows)
+        for r in range(rows):
+            for c in range(cols):
+                yield img.crop((c * tw, r * th,
+                                min(img.width, (c + 1) * tw),
+                                min(img.height, (r + 1) * th)))
+
+    def _encode_one(self, img: Image.Image) -> EncodedImage:
+        start = time.perf_counter()
+        fmt   = self.settings["format"]
+        scale = self.settings["max_side"] / max(img.size)
+        if scale < 1:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img  = img.resize(size, Image.BILINEAR, reducing_gap=3.0)
+
+        buf = io.BytesIO()
+        if fmt == "PNG":
+            img.save(buf, format="PNG", compress_level=self.settings["png_level"])
+        else:
+            img.save(buf, format=fmt, quality=self.settings["quality"])
+        return EncodedImage(
+            data      = buf.getvalue(),
+            mime_type = MIME_TYPES[fmt],
+            width     = img.width,
+            height    = img.height,
+            encode_ms = (time.perf_counter() - start) * 1000
+        )
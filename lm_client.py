@@ -4,31 +4,52 @@ import base64
 from pathlib import Path
 from openai import OpenAI
 import json
+import re
+import time
+import logging
 import requests
+from http_transport import get_transport
+from metrics import span, observe
+
+log = logging.getLogger(__name__)
+
+# statuses meaning "this server won't take several images in one request"
+MULTI_IMAGE_REJECTED = {400, 413, 415, 422}
 
 class LMClient:
-    def __init__(self, base_url: str, api_key: str, model: str):
+    def __init__(self, base_url: str, api_key: str, model: str, transport=None):
         self.base_url = base_url.rstrip("/")
         self.api_key   = api_key
         self.model     = model
+        self.http      = transport or get_transport()
+        # None = unknown yet; set False once the server rejects multi-image requests
+        self.multi_image = None
+        self.last_ttft = None   # seconds to first streamed token, last stream
 
-    def chat(self, system_prompt: str, user_prompt: str) -> str:
-        url = f"{self.base_url}/v1/chat/completions"
-        body = {
+    def _chat_body(self, system_prompt: str, user_prompt: str, history: list = None) -> dict:
+        # history: earlier {"role", "content"} turns, oldest first
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
+                *(history or []),
                 {"role": "user",   "content": user_prompt}
             ]
         }
-        print(f"[LLM CHAT DEBUG] → POST {url}")
-        print(f"[LLM CHAT DEBUG]   JSON={json.dumps(body)[:200]}…")
+
+    def chat(self, system_prompt: str, user_prompt: str, history: list = None,
+             abort=None) -> str:
+        """`abort`: an http_transport.Abort that can stop the request from another thread."""
+        url = f"{self.base_url}/v1/chat/completions"
+        body = self._chat_body(system_prompt, user_prompt, history)
+        log.debug("chat → POST %s (%d messages)", url, len(body["messages"]))
         try:
-            resp = requests.post(url, json=body, timeout=15)
-            print(f"[LLM CHAT DEBUG] ← {resp.status_code} {resp.text[:200]!r}")
+            with span("lm_completion", kind="chat"):
+                resp = self.http.post(url, json=body, timeout=15, abort=abort)
+            log.debug("chat ← %s", resp.status_code)
             resp.raise_for_status()
         except Exception as e:
-            print(f"[LLM CHAT DEBUG] Exception: {type(e).__name__}: {e}")
+            log.warning("chat failed: %s: %s", type(e).__name__, e)
             raise
         return resp.json()["choices"][0]["message"]["content"]
 
@@ -40,26 +61,160 @@ class LMClient:
         raw  = path.read_bytes()
         return self.send_screenshot_data(raw, system_prompt, user_prompt)
 
-    def send_screenshot_data(self, png_bytes: bytes, system_prompt: str, user_prompt: str) -> str:
+    def send_screenshot_data(self, png_bytes, system_prompt: str, user_prompt: str) -> str:
+        return self.send_images_data([png_bytes], system_prompt, user_prompt)
+
+    @staticmethod
+    def _image_part(img) -> dict:
+        # raw bytes are legacy full-res PNGs; anything else is an EncodedImage
+        if isinstance(img, (bytes, bytearray)):
+            with span("base64"):
+                return {"mime_type": "image/png", "data": base64.b64encode(img).decode()}
+        if img.b64:
+            return {"mime_type": img.mime_type, "data": img.b64}
+        with span("base64"):
+            return {"mime_type": img.mime_type, "data": base64.b64encode(img.data).decode()}
+
+    def _images_body(self, images: list, system_prompt: str, user_prompt: str) -> dict:
+        body = self._chat_body(system_prompt, user_prompt)
+        body["images"] = [self._image_part(img) for img in images]
+        return body
+
+    def send_images_data(self, images: list, system_prompt: str, user_prompt: str,
+                         abort=None) -> str:
+        """
+        Same as send_screenshot_data, but with several images (e.g. ROI crops
+        or tiles) attached to one request. Items are PNG bytes or EncodedImage.
+        """
         url = f"{self.base_url}/v1/chat/completions"
-        b64 = base64.b64encode(png_bytes).decode()
-        body = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": user_prompt}
-            ],
-            "images": [
-                {"mime_type": "image/png", "data": b64}
-            ]
-        }
-        print(f"[LLM IMG DEBUG] → POST {url}")
-        print(f"[LLM IMG DEBUG]   JSON keys={list(body.keys())}, img_bytes={len(png_bytes)}")
+        body = self._images_body(images, system_prompt, user_prompt)
+        if log.isEnabledFor(logging.DEBUG):
+            parts = body["images"]
+            log.debug("images → POST %s images=%d b64_bytes=%d",
+                      url, len(parts), sum(len(p["data"]) for p in parts))
         try:
-            resp = requests.post(url, json=body, timeout=30)
-            print(f"[LLM IMG DEBUG] ← {resp.status_code} {resp.text[:200]!r}")
+            with span("lm_completion", kind="images"):
+                resp = self.http.post(url, json=body, timeout=30, abort=abort)
+            log.debug("images ← %s", resp.status_code)
             resp.raise_for_status()
         except Exception as e:
-            print(f"[LLM IMG DEBUG] Exception: {type(e).__name__}: {e}")
+            log.warning("images request failed: %s: %s", type(e).__name__, e)
             raise
         return resp.json()["choices"][0]["message"]["content"]
+
+    # ─── Multi-image ──────────────────────────────────────────────────
+
+    _FRAME_LINE = re.compile(r"^\W*frame\s+(\d+)\W*\s*[:.\-–][\s*_]*(.*)$", re.IGNORECASE)
+
+    def describe_frames(self, frames: list, system_prompt: str, user_prompt: str,
+                        per_frame: bool = False):
+        """
+        Send N frames as image parts of ONE completion, so the system/user
+        prompt is only prefilled once. Returns one combined analysis (str),
+        or with per_frame=True a list of descriptions, one per frame.
+
+        Falls back to one send_screenshot_data call per frame when the
+        server rejects multi-image requests (remembered in self.multi_image),
+        or for frames missing from a per-frame answer.
+        """
+        if len(frames) == 1:
+            reply = self.send_screenshot_data(frames[0], system_prompt, user_prompt)
+            return [reply] if per_frame else reply
+
+        if self.multi_image is not False:
+            prompt = f"{user_prompt}\n\nYou are given {len(frames)} frames, in order."
+            if per_frame:
+                prompt += (" Describe each frame separately, one line per frame, "
+                           "starting with 'Frame 1:', 'Frame 2:' and so on.")
+            try:
+                reply = self.send_images_data(frames, system_prompt, prompt)
+                self.multi_image = True
+            except requests.HTTPError as e:
+                # only a rejection of the request itself says the server
+                # can't take several images; 429/5xx are transient
+                if e.response is None or e.response.status_code not in MULTI_IMAGE_REJECTED:
+                    raise
+                log.info("multi-image request rejected, "
+                         "falling back to one call per frame: %s", e)
+                self.multi_image = False
+            else:
+                if not per_frame:
+                    return reply
+                found = self._split_frames(reply, len(frames))
+                return [
+                    found[i] if i in found else
+                    self.send_screenshot_data(frames[i], system_prompt, user_prompt)
+                    for i in range(len(frames))
+                ]
+
+        replies = [self.send_screenshot_data(f, system_prompt, user_prompt) for f in frames]
+        return replies if per_frame else "\n\n".join(replies)
+
+    def _split_frames(self, reply: str, n: int) -> dict:
+        """Parse 'Frame i: …' lines (continuations included) into {index: text}."""
+        found, current = {}, None
+        for line in reply.splitlines():
+            m = self._FRAME_LINE.match(line.strip())
+            if m and 1 <= int(m.group(1)) <= n:
+                current = int(m.group(1)) - 1
+                found[current] = m.group(2).strip()
+            elif current is not None and line.strip():
+                found[current] += " " + line.strip()
+        return found
+
+    # ─── Streaming ────────────────────────────────────────────────────
+
+    def stream_chat(self, system_prompt: str, user_prompt: str, history: list = None,
+                    abort=None):
+        """Like chat(), but yields content tokens as the server generates them."""
+        body = self._chat_body(system_prompt, user_prompt, history)
+        return self._stream(body, timeout=15, tag="chat", abort=abort)
+
+    def stream_images_data(self, images: list, system_prompt: str, user_prompt: str,
+                           abort=None):
+        """Like send_images_data(), but yields content tokens as they arrive."""
+        body = self._images_body(images, system_prompt, user_prompt)
+        return self._stream(body, timeout=30, tag="images", abort=abort)
+
+    def _stream(self, body: dict, timeout: float, tag: str, abort=None):
+        """
+        POST with "stream": true and parse the SSE reply. The timeout applies
+        between chunks, not to the whole completion. Closing the generator
+        early closes the connection, which stops generation server-side;
+        so does abort.abort() from another thread, even before the first token.
+        """
+        url = f"{self.base_url}/v1/chat/completions"
+        body = {**body, "stream": True}
+        log.debug("%s stream → POST %s", tag, url)
+        start = time.perf_counter()
+        self.last_ttft = None
+        try:
+            resp = self.http.post(url, json=body, timeout=timeout, stream=True, abort=abort)
+            resp.raise_for_status()
+        except Exception as e:
+            log.warning("%s stream failed: %s: %s", tag, type(e).__name__, e)
+            raise
+
+        try:
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                token = (choices[0].get("delta") or {}).get("content")
+                if not token:
+                    continue
+                if self.last_ttft is None:
+                    self.last_ttft = time.perf_counter() - start
+                    observe("lm_ttft", self.last_ttft * 1000, kind=tag)
+                    log.debug("%s stream first token after %.0f ms", tag, self.last_ttft * 1000)
+                yield token
+        finally:
+            if abort is not None:
+                abort.detach()
+            resp.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        observe("lm_completion", elapsed, kind=tag)
+        log.debug("%s stream ← done in %.0f ms", tag, elapsed)
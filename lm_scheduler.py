@@ -0,0 +1,139 @@
+# lm_scheduler.py
+
+import heapq
+import logging
+import itertools
+import asyncio
+from concurrent.futures import Future
+
+log = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+INTERACTIVE = 0   # typed chat
+SCREENSHOT  = 1   # hotkey / button screenshots
+COMMENTARY  = 2   # commentary loop and batches
+BACKGROUND  = 3   # memory summarization etc.
+
+PRIORITY_NAMES = ("interactive", "screenshot", "commentary", "background")
+
+# running jobs of these classes may be cancelled to make room
+PREEMPTIBLE = (COMMENTARY, BACKGROUND)
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "make_coro", "key", "future", "task")
+
+    def __init__(self, priority, seq, make_coro, key):
+        self.priority  = priority
+        self.seq       = seq
+        self.make_coro = make_coro
+        self.key       = key
+        self.future    = Future()
+        self.task      = None
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LMScheduler:
+    """
+    Single gate in front of the LM server for every caller (chat, hotkey
+    screenshots, commentary, batches, summarization).
+
+    - At most `max_inflight` requests run at once; the rest wait in a
+      priority queue (INTERACTIVE > SCREENSHOT > COMMENTARY > BACKGROUND,
+      FIFO within a class).
+    - A job submitted with a `key` supersedes any queued job with the same
+      key, so the commentary loop never builds a backlog of stale frames.
+    - An INTERACTIVE job preempts (cancels) running COMMENTARY/BACKGROUND
+      jobs; any other job preempts lower preemptible ones when no slot is free.
+
+    Everything runs on the BackgroundLoop's thread; submit() and the
+    returned Future's cancel() are safe from any thread.
+    """
+    def __init__(self, loop, max_inflight: int = 1):
+        self.loop         = loop        # async_clients.BackgroundLoop
+        self.max_inflight = max_inflight
+        self._queue       = []          # heap of _Job
+        self._running     = set()
+        self._seq         = itertools.count()
+        self.counts       = {"submitted": 0, "superseded": 0, "preempted": 0}
+
+    def submit(self, make_coro, priority: int = INTERACTIVE, key: str = None) -> Future:
+        """
+        `make_coro()` builds the coroutine when the job is started. Returns a
+        concurrent.futures.Future; cancelling it dequeues or cancels the job.
+        """
+        job = _Job(priority, next(self._seq), make_coro, key)
+        job.future.add_done_callback(
+            lambda f: f.cancelled() and self.loop.loop.call_soon_threadsafe(self._drop, job)
+        )
+        self.loop.loop.call_soon_threadsafe(self._enqueue, job)
+        return job.future
+
+    def stats(self) -> dict:
+        queued = [0] * len(PRIORITY_NAMES)
+        for job in list(self._queue):
+            queued[job.priority] += 1
+        return {
+            **self.counts,
+            "running": len(self._running),
+            "queued":  dict(zip(PRIORITY_NAMES, queued))
+        }
+
+    # ─── Loop thread ──────────────────────────────────────────────────
+
+    def _enqueue(self, job: _Job):
+        self.counts["submitted"] += 1
+        if job.key is not None:
+            for old in self._queue:
+                if old.key == job.key and not old.future.done():
+                    old.future.cancel()
+                    self.counts["superseded"] += 1
+        heapq.heappush(self._queue, job)
+        self._preempt(job)
+        self._pump()
+
+    def _preempt(self, job: _Job):
+        live    = [r for r in self._running if not r.future.done()]
+        victims = [r for r in live
+                   if r.priority in PREEMPTIBLE and r.priority > job.priority]
+        if job.priority != INTERACTIVE:
+            if len(live) < self.max_inflight or not victims:
+                return
+            victims = [max(victims)]   # free one slot: the least urgent, newest job
+        for victim in victims:
+            self.counts["preempted"] += 1
+            log.debug("preempting %s job for %s",
+                      PRIORITY_NAMES[victim.priority], PRIORITY_NAMES[job.priority])
+            victim.future.cancel()
+
+    def _drop(self, job: _Job):
+        # the caller (or _enqueue/_preempt) cancelled the job's Future
+        if job.task is not None:
+            job.task.cancel()
+        elif job in self._queue:
+            self._queue.remove(job)
+            heapq.heapify(self._queue)
+
+    def _pump(self):
+        while self._queue and len(self._running) < self.max_inflight:
+            job = heapq.heappop(self._queue)
+            # the Future stays pending (not "running") so cancel() keeps working
+            if job.future.done():
+                continue
+            self._running.add(job)
+            job.task = asyncio.ensure_future(job.make_coro())
+            job.task.add_done_callback(lambda t, job=job: self._finished(job, t))
+
+    def _finished(self, job: _Job, task):
+        self._running.discard(job)
+        if job.future.done():
+            pass   # cancelled by the caller or preempted
+        elif task.cancelled():
+            job.future.cancel()
+        elif task.exception() is not None:
+            job.future.set_exception(task.exception())
+        else:
+            job.future.set_result(task.result())
+        self._pump()
@@ -0,0 +1,125 @@
+# local_index.py
+
+import os
+import re
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def embed(text: str, dim: int = 512) -> np.ndarray:
+    """
+    Hashing-trick embedding: word unigrams and bigrams are hashed into `dim`
+    signed buckets and the result is L2-normalized, so a dot product is the
+    cosine similarity. Needs no model and costs microseconds per text.
+    """
+    words = _TOKEN.findall(text.casefold())
+    vec   = np.zeros(dim, dtype=np.float32)
+    for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class LocalIndex:
+    """
+    Small in-process vector index for the notes we ingest ourselves.
+    Embeddings live in a float32 matrix searched by brute force (one
+    matrix-vector product); with `path` the matrix is a memory-mapped .npy
+    file and the texts/metadata sit next to it as JSON.
+
+    Capacity doubles when full; identical texts are stored once.
+    """
+    def __init__(self, path: str = None, dim: int = 512, capacity: int = 1024):
+        self.path    = path
+        self.dim     = dim
+        self._lock   = threading.Lock()
+        self._docs   = []      # [{"text", "metadata"}], row i ↔ self._vecs[i]
+        self._seen   = set()
+        self._dirty  = False
+        self._vecs   = None
+        if path:
+            self.load()
+        if self._vecs is None:
+            self._vecs = self._alloc(capacity)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _alloc(self, capacity: int) -> np.ndarray:
+        if not self.path:
+            return np.zeros((capacity, self.dim), dtype=np.float32)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return np.lib.format.open_memmap(
+            f"{self.path}.npy", mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+
+    def add(self, text: str, metadata: dict = None) -> bool:
+        """Index `text`; returns False if it was already there."""
+        text = text.strip()
+        if not text:
+            return False
+        vec = embed(text, self.dim)
+        with self._lock:
+            if text in self._seen:
+                return False
+            n = len(self._docs)
+            if n == len(self._vecs):
+                old = np.array(self._vecs[:n])
+                del self._vecs        # release the old mapping before rewriting
+                self._vecs = self._alloc(2 * n)
+                self._vecs[:n] = old
+            self._vecs[n] = vec
+            self._docs.append({"text": text, "metadata": dict(metadata or {})})
+            self._seen.add(text)
+            self._dirty = True
+            return True
+
+    def search(self, query_text: str, top_k: int = 5, min_score: float = 0.0) -> list[dict]:
+        """Top-k docs by cosine similarity, in RAGClient.query's result format."""
+        q = embed(query_text, self.dim)
+        with self._lock:
+            n = len(self._docs)
+            if n == 0 or not q.any():
+                return []
+            scores = self._vecs[:n] @ q
+            k      = min(top_k, n)
+            best   = np.argpartition(-scores, k - 1)[:k]
+            best   = best[np.argsort(-scores[best])]
+            return [
+                {
+                    "text":     self._docs[i]["text"],
+                    "metadata": {**self._docs[i]["metadata"],
+                                 "score": float(scores[i]), "source": "local"}
+                }
+                for i in best if scores[i] >= min_score
+            ]
+
+    def load(self):
+        try:
+            with open(f"{self.path}.json", "r", encoding="utf-8") as f:
+                docs = json.load(f)
+            vecs = np.load(f"{self.path}.npy", mmap_mode="r+")
+        except (OSError, ValueError):
+            return
+        if vecs.ndim != 2 or vecs.shape[1] != self.dim or len(vecs) < len(docs):
+            return   # written with another dim: start over
+        self._vecs = vecs
+        self._docs = docs
+        self._seen = {d["text"] for d in docs}
+
+    def save(self):
+        """Flush the memmap and (atomically) rewrite the doc list if anything changed."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            docs, self._dirty = list(self._docs), False
+            self._vecs.flush()
+        tmp = f"{self.path}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(docs, f)
+        os.replace(tmp, f"{self.path}.json")
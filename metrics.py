@@ -0,0 +1,168 @@
+# metrics.py
+
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Span names used across the pipeline (all durations in ms):
+#   capture, encode, base64, http_send, lm_ttft, lm_completion,
+#   rag_query, tts_synth, tts_playback, ui_tick, ui_latency
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Count/sum plus a bounded reservoir of recent samples for percentiles."""
+    def __init__(self, window: int = 2048):
+        self.samples = deque(maxlen=window)
+        self.count   = 0
+        self.total   = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        out = {"count": self.count, "sum": self.total}
+        for q in QUANTILES:
+            out[f"p{int(q * 100)}"] = (
+                ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+            )
+        return out
+
+
+class Metrics:
+    """
+    Named latency spans aggregated into histograms.
+
+    With enabled=False, span() hands back a shared no-op context manager and
+    observe() returns immediately, so instrumented code costs one attribute
+    check. With `trace_path`, every observation is also appended to a JSONL
+    file (one {"ts", "span", "ms", ...labels} object per line).
+    """
+    def __init__(self, enabled: bool = True, trace_path: str = None, window: int = 2048):
+        self.enabled     = enabled
+        self.window      = window
+        self._hists      = {}
+        self._lock       = threading.Lock()
+        self._trace      = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def observe(self, name: str, ms: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None:
+                hist = self._hists[name] = Histogram(self.window)
+            hist.add(ms)
+            if self._trace is not None:
+                self._trace.write(json.dumps(
+                    {"ts": time.time(), "span": name, "ms": round(ms, 3), **labels}) + "\n")
+
+    def span(self, name: str, **labels):
+        """`with metrics.span("encode"): ...` records the block's duration."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, labels)
+
+    @contextmanager
+    def _span(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._hists.items())}
+
+    def write_jsonl(self, path: str):
+        """Append one summary line per span to `path`."""
+        now = time.time()
+        with open(path, "a", encoding="utf-8") as f:
+            for name, s in self.snapshot().items():
+                f.write(json.dumps({"ts": now, "span": name, **s}) + "\n")
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition: one summary (ms) per span."""
+        lines = []
+        for name, s in self.snapshot().items():
+            metric = "danzar_" + "".join(c if c.isalnum() else "_" for c in name) + "_ms"
+            lines.append(f"# TYPE {metric} summary")
+            for q in QUANTILES:
+                lines.append(f'{metric}{{quantile="{q}"}} {s[f"p{int(q * 100)}"]:.3f}')
+            lines.append(f"{metric}_sum {s['sum']:.3f}")
+            lines.append(f"{metric}_count {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Expose /metrics (Prometheus) and /metrics.json on a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = metrics.prometheus_text(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(metrics.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+def span(name: str, **labels):
+    return _metrics.span(name, **labels)
+
+def observe(name: str, ms: float, **labels):
+    _metrics.observe(name, ms, **labels)
+
+def configure_metrics(enabled: bool = True, trace_path: str = None) -> Metrics:
+    """Replace the process-wide Metrics (like http_transport.configure_transport)."""
+    global _metrics
+    _metrics.close()
+    _metrics = Metrics(enabled, trace_path or None)
+    return _metrics
+
+def metrics_from_settings(cfg: dict) -> Metrics:
+    m = configure_metrics(cfg.get("metrics_enabled", True), cfg.get("metrics_trace_path"))
+    if cfg.get("metrics_port"):
+        m.serve(cfg["metrics_port"])
+    return m
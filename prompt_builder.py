@@ -0,0 +1,124 @@
+# prompt_builder.py
+
+import re
+import math
+
+DEFAULT_BUDGET = {
+    "context_tokens": 4096,   # model context window
+    "reserve_tokens": 512,    # kept free for the reply
+    "capture_chars":  300,    # older captures are cut to this when compressing
+    "rag_snippets":   4       # at most this many RAG snippets
+}
+
+# Built-in per-model defaults, matched as a substring of model_name.
+# settings.json "prompt_budgets" (keyed by exact model_name) overrides these.
+MODEL_BUDGETS = {
+    "qwen3-30b":  {"context_tokens": 8192, "reserve_tokens": 768},
+    "gemma-3":    {"context_tokens": 8192},
+    "qwen2.5-vl": {"context_tokens": 8192},
+    "llava":      {"context_tokens": 4096},
+}
+
+_FIELD = re.compile(r"\{(n|captures|rag_context)\}")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token for English prose)."""
+    return math.ceil(len(text) / 4)
+
+def _clip(text: str, max_chars: int) -> str:
+    """Cut to whole sentences (or words) within max_chars."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if end > max_chars // 3:
+        return cut[:end + 1]
+    return cut.rsplit(" ", 1)[0] + "…"
+
+
+class PromptAssembler:
+    """
+    Fills the commentary template fields ({n}, {captures}, {rag_context})
+    and keeps the prompt within the model's context budget.
+
+    When over budget, it trims by priority: surplus RAG snippets (lowest
+    score first), then older captures are shortened, then dropped oldest
+    first. The newest capture and the best snippet go last.
+
+    The system prompt is passed through untouched and RAG snippets are
+    emitted in a canonical order, so the request prefix stays
+    byte-identical across calls and the LM server can reuse its prompt cache.
+    """
+    def __init__(self, settings: dict = None):
+        self.settings = {**DEFAULT_BUDGET, **(settings or {})}
+        self.last_stats = None
+
+    @classmethod
+    def for_model(cls, model_name: str, overrides: dict = None):
+        settings = {}
+        name = (model_name or "").lower()
+        for key, preset in MODEL_BUDGETS.items():
+            if key in name:
+                settings.update(preset)
+                break
+        settings.update((overrides or {}).get(model_name, {}))
+        return cls(settings)
+
+    @property
+    def budget(self) -> int:
+        return self.settings["context_tokens"] - self.settings["reserve_tokens"]
+
+    def build(self, system: str, template: str, captures: list = (), rag: list = ()):
+        """
+        captures: description strings, oldest first.
+        rag:      RAGClient.query results ({"text", "metadata": {"score"}}).
+        Returns (system, user).
+        """
+        caps   = [[i, c.strip()] for i, c in enumerate(captures) if c and c.strip()]
+        ranked = sorted(rag, key=lambda h: -h.get("metadata", {}).get("score", 0))
+        seen   = {c for _, c in caps}   # our own captures come back from RAG too
+        notes  = [t for t in dict.fromkeys(h["text"].strip() for h in ranked)
+                  if t and t not in seen][:self.settings["rag_snippets"]]
+        limit  = self.budget - estimate_tokens(system)
+
+        user = self._fill(template, caps, notes, len(captures))
+        # 1) drop surplus RAG snippets, keeping the best one
+        while estimate_tokens(user) > limit and len(notes) > 1:
+            notes.pop()
+            user = self._fill(template, caps, notes, len(captures))
+        # 2) shorten older captures
+        if estimate_tokens(user) > limit:
+            for cap in caps[:-1]:
+                cap[1] = _clip(cap[1], self.settings["capture_chars"])
+            user = self._fill(template, caps, notes, len(captures))
+        # 3) drop older captures, oldest first
+        while estimate_tokens(user) > limit and len(caps) > 1:
+            caps.pop(0)
+            user = self._fill(template, caps, notes, len(captures))
+        # 4) last resort: no notes, then clip whatever is left
+        if estimate_tokens(user) > limit and notes:
+            notes = []
+            user = self._fill(template, caps, notes, len(captures))
+        if estimate_tokens(user) > limit:
+            user = _clip(user, max(0, limit) * 4)
+
+        self.last_stats = {
+            "system_tokens": estimate_tokens(system),
+            "user_tokens":   estimate_tokens(user),
+            "budget":        self.budget,
+            "captures":      f"{len(caps)}/{len(captures)}",
+            "rag_snippets":  len(notes)
+        }
+        return system, user
+
+    @staticmethod
+    def _fill(template: str, caps: list, notes: list, total: int) -> str:
+        # snippets sorted by text, so the same notes always give the same bytes
+        rag_context = "\n".join(f"- {t}" for t in sorted(notes))
+        fields = {
+            "n":           str(total),
+            "captures":    "\n\n".join(f"Capture {i+1}: {c}" for i, c in caps),
+            "rag_context": f"Notes:\n{rag_context}" if notes else ""
+        }
+        user = _FIELD.sub(lambda m: fields[m.group(1)], template)
+        return re.sub(r"\n{3,}", "\n\n", user).strip()
@@ -1,34 +1,171 @@
 # rag_client.py
 
-import requests
-import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from http_transport import get_transport
+from metrics import span
+
+log = logging.getLogger(__name__)
 
 class RAGClient:
-    def __init__(self, add_url: str, query_url: str):
+    def __init__(self, add_url: str, query_url: str, transport=None,
+                 bulk_url: str = None, batch_size: int = 16,
+                 flush_interval: float = 2.0, max_pending: int = 256,
+                 cache_size: int = 256, cache_ttl: float = 120.0,
+                 local_index=None, local_min_score: float = 0.35):
         self.add_url   = add_url
         self.query_url = query_url
+        self.http      = transport or get_transport()
+
+        # Write-behind ingestion queue (see enqueue_text)
+        self.bulk_url       = bulk_url      # POST {"items": [...]} if the server has one
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending    = max_pending
+        self._pending       = deque()
+        self._cond          = threading.Condition()
+        self._writer        = None
+        self._inflight      = 0
+        self.dropped        = 0
+
+        # Query result cache (see query); cache_size=0 disables it
+        self.cache_size     = cache_size
+        self.cache_ttl      = cache_ttl
+        self._cache         = OrderedDict()   # (query, top_k) → (time, results)
+        self._inflight_q    = {}              # (query, top_k) → Future
+        self._cache_lock    = threading.Lock()
+        self._generation    = 0               # bumped by invalidate_cache()
+        self.cache_hits = self.cache_misses = self.coalesced = 0
+
+        # Optional LocalIndex mirror of what we ingest, searched before the server
+        self.local_index      = local_index
+        self.local_min_score  = local_min_score
+        self.remote_cooldown  = 30.0
+        self._remote_down     = 0.0          # monotonic time until which we skip /query
 
     def add_text(self, payload: dict):
-        resp = requests.post(self.add_url, json=payload, timeout=30)
+        """Synchronous ingest; later queries see it (the cache is dropped)."""
+        self._post_add(payload)
+        self.invalidate_cache()
+
+    def _post_add(self, payload: dict):
+        resp = self.http.post(self.add_url, json=payload, timeout=30)
         resp.raise_for_status()
 
     def add_image(self, id: str, b64_png: str, caption: str):
-        resp = requests.post(
+        resp = self.http.post(
             self.add_url,
             json={"image": b64_png, "caption": caption},
             timeout=30
         )
         resp.raise_for_status()
+        self.invalidate_cache()
+
+    @staticmethod
+    def _normalize(query_text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", query_text).casefold().split())
 
     def query(self, query_text: str, top_k: int = 5) -> list[dict]:
+        """
+        Search the local index first; the remote server (game wiki etc.) is
+        only asked when the local notes can't fill `top_k`. With a local
+        index, a failing server is skipped for `remote_cooldown` seconds and
+        the local results are returned on their own.
+        """
+        if self.local_index is None:
+            return self._remote_query(query_text, top_k)
+
+        with span("rag_query", source="local"):
+            local = self.local_index.search(query_text, top_k, self.local_min_score)
+        if len(local) >= top_k or time.monotonic() < self._remote_down:
+            return local
+        try:
+            remote = self._remote_query(query_text, top_k)
+        except Exception as e:
+            log.warning("remote query failed, using %d local hits: %s", len(local), e)
+            self._remote_down = time.monotonic() + self.remote_cooldown
+            return local
+        seen = {r["text"] for r in local}
+        return (local + [r for r in remote if r["text"] not in seen])[:top_k]
+
+    def _remote_query(self, query_text: str, top_k: int) -> list[dict]:
+        """
+        Cached remote lookup. Results are kept for `cache_ttl` seconds (LRU-bounded
+        to `cache_size`). Background (write-behind) ingests don't clear the
+        cache, so remote answers may lag them by up to `cache_ttl`; the local
+        index already holds those notes. Identical queries issued while one
+        is in flight share its request.
+        """
+        if not self.cache_size:
+            return self._query(query_text, top_k)
+
+        key = (self._normalize(query_text), top_k)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None and time.monotonic() - hit[0] <= self.cache_ttl:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return list(hit[1])
+            fut = self._inflight_q.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight_q[key] = Future()
+                generation = self._generation
+                self.cache_misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return list(fut.result())
+
+        try:
+            results = self._query(query_text, top_k)
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(results)
+            with self._cache_lock:
+                # don't cache an answer that predates an invalidation
+                if generation == self._generation:
+                    self._cache[key] = (time.monotonic(), results)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            return list(results)
+        finally:
+            with self._cache_lock:
+                self._inflight_q.pop(key, None)
+
+    def invalidate_cache(self):
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def cache_stats(self) -> dict:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "entries":   len(self._cache),
+            "hits":      self.cache_hits,
+            "misses":    self.cache_misses,
+            "coalesced": self.coalesced,
+            "hit_rate":  self.cache_hits / total if total else 0.0
+        }
+
+    def _query(self, query_text: str, top_k: int) -> list[dict]:
         payload = {"query": query_text}
-        print(f"[RAG DEBUG] → POST {self.query_url}  payload={json.dumps(payload)}")
+        log.debug("→ POST %s query=%r", self.query_url, query_text)
         try:
-            resp = requests.post(self.query_url, json=payload, timeout=10)
-            print(f"[RAG DEBUG] ← {resp.status_code}  body={resp.text[:200]!r}")
+            with span("rag_query", source="remote"):
+                resp = self.http.post(self.query_url, json=payload, timeout=10, idempotent=True)
+            log.debug("← %s", resp.status_code)
             resp.raise_for_status()
         except Exception as e:
-            print(f"[RAG DEBUG] Exception: {e}")
+            log.warning("query failed: %s", e)
             raise
 
         data = resp.json()
@@ -37,3 +174,100 @@ class RAGClient:
             {"text": s["text"], "metadata":{"type":s["type"],"score":s.get("score",0)}}
             for s in sources[:top_k]
         ]
+
+    def add_and_query(self, payload: dict, query_text: str = None, top_k: int = 5) -> list[dict]:
+        """
+        Queue `payload` for ingestion (write-behind) and query right away.
+        The query text defaults to the payload's text. Only the query is on
+        the caller's path; the write never delays it.
+        """
+        self.enqueue_text(payload)
+        return self.query(query_text or payload.get("text", ""), top_k)
+
+    # ─── Write-behind ingestion ───────────────────────────────────────
+
+    def enqueue_text(self, payload: dict, block: bool = False, timeout: float = None) -> bool:
+        """
+        Queue a payload for the background writer, which flushes batches of
+        `batch_size` (or whatever is pending after `flush_interval` seconds).
+        At most `max_pending` items are held: with block=True the caller
+        waits for room, otherwise the oldest pending item is dropped.
+        Returns False if the item was not queued (block timed out).
+        The text is also added to the local index right away.
+        """
+        if self.local_index is not None:
+            text = payload.get("text") or payload.get("caption")
+            if text:
+                self.local_index.add(text, {"type": payload.get("type", "note")})
+        with self._cond:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer.start()
+            if len(self._pending) >= self.max_pending:
+                if block:
+                    if not self._cond.wait_for(
+                            lambda: len(self._pending) < self.max_pending, timeout):
+                        return False
+                else:
+                    self._pending.popleft()
+                    self.dropped += 1
+            self._pending.append(payload)
+            self._cond.notify_all()
+            return True
+
+    def enqueue_image(self, id: str, b64_png: str, caption: str, **kwargs) -> bool:
+        return self.enqueue_text({"image": b64_png, "caption": caption}, **kwargs)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far has been written."""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._inflight, timeout)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _writer_loop(self):
+        backoff = 0.5
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                # give a batch `flush_interval` to fill up
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.batch_size:
+                    left = deadline - time.monotonic()
+                    if left <= 0 or not self._cond.wait(left):
+                        break
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.batch_size, len(self._pending)))]
+                self._inflight = len(batch)
+                self._cond.notify_all()   # room for blocked producers
+
+            try:
+                self._send_batch(batch)
+                backoff = 0.5
+            except Exception as e:
+                log.warning("ingest of %d items failed, retrying in %.1fs: %s",
+                            len(batch), backoff, e)
+                with self._cond:
+                    # put the batch back in front, still within max_pending
+                    room = self.max_pending - len(self._pending)
+                    self.dropped += max(0, len(batch) - room)
+                    self._pending.extendleft(reversed(batch[-room:] if room > 0 else []))
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                with self._cond:
+                    self._inflight = 0
+                    self._cond.notify_all()
+
+    def _send_batch(self, batch: list[dict]):
+        if self.bulk_url:
+            resp = self.http.post(self.bulk_url, json={"items": batch}, timeout=30)
+            resp.raise_for_status()
+            return
+        # no bulk endpoint: one /add per item, still off the request path
+        while batch:
+            self._post_add(batch[0])
+            batch.pop(0)
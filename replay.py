@@ -0,0 +1,282 @@
+# replay.py
+"""
+Headless replay: feed recorded frames (a directory of images or a video
+file) through the commentary pipeline with no Tk and no screen capture.
+
+    python replay.py recordings/session1/ --profile rimworld --fps 1
+    python replay.py session.mp4 --sample-fps 0.5 --realtime --out replay.jsonl
+    python replay.py frames/ --ingest-only          # bulk pre-ingestion into RAG
+
+Per frame: change gate → vision cache → encode → vision call → RAG ingest +
+conversation memory. Every --batch described frames, a commentary summary
+is generated from the profile's commentary template. Video input needs
+OpenCV (pip install opencv-python).
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from config import load_settings, load_profile, profile_cache_dir, setup_logging
+from http_transport import transport_from_settings
+from metrics import metrics_from_settings, span
+from frame_gate import FrameChangeGate
+from image_encoder import ImageEncoder
+from vision_cache import VisionCache, dhash
+from lm_client import LMClient
+from rag_client import RAGClient
+from local_index import LocalIndex
+from prompt_builder import PromptAssembler
+from conversation_memory import ConversationMemory
+
+log = logging.getLogger("replay")
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+
+# ─── Frame sources: yield (timestamp_s, RGB ndarray, name) ────────────
+
+def frames_from_dir(path: str, fps: float):
+    names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTS))
+    for i, name in enumerate(names):
+        with Image.open(os.path.join(path, name)) as img:
+            yield i / fps, np.asarray(img.convert("RGB")), name
+
+def frames_from_video(path: str, sample_fps: float):
+    try:
+        import cv2
+    except ImportError:
+        raise SystemExit("Video input needs OpenCV: pip install opencv-python")
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video: {path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    step      = max(1, round(video_fps / sample_fps)) if sample_fps else 1
+    index     = 0
+    try:
+        while True:
+            if not cap.grab():
+                break
+            if index % step == 0:
+                ok, bgr = cap.retrieve()
+                if not ok:
+                    break
+                yield index / video_fps, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), f"frame{index:06d}"
+            index += 1
+    finally:
+        cap.release()
+
+
+class Replay:
+    """The app's per-frame pipeline, minus Tk, capture and TTS."""
+    def __init__(self, cfg: dict, profile: dict, profile_name: str, args):
+        self.cfg      = cfg
+        self.args     = args
+        self.system   = profile.get("system") or profile.get("system_prompt", "")
+        self.shot     = profile.get("screenshot") or profile.get("screenshot_prompt", "")
+        self.template = profile.get("commentary") or profile.get("commentary_prompt", "")
+
+        self.lm  = LMClient(cfg["lmstudio_url"], "", cfg["model_name"])
+        self.rag = RAGClient(
+            cfg["rag_add_url"], cfg["rag_query_url"],
+            bulk_url        = cfg.get("rag_bulk_url") or None,
+            batch_size      = cfg["rag_batch_size"],
+            flush_interval  = cfg["rag_flush_interval"],
+            max_pending     = cfg["rag_max_pending"],
+            cache_size      = cfg["rag_cache_size"],
+            cache_ttl       = cfg["rag_cache_ttl"],
+            local_index     = LocalIndex(
+                os.path.join(profile_cache_dir(profile_name), "rag_index"),
+                dim = cfg["rag_local_dim"]
+            ) if cfg["rag_local_index"] else None,
+            local_min_score = cfg["rag_local_min_score"]
+        )
+        self.gate    = FrameChangeGate(cfg["change_threshold"])
+        self.encoder = ImageEncoder.for_model(cfg["model_name"], cfg.get("image_encoders"))
+        self.prompts = PromptAssembler.for_model(cfg["model_name"], cfg.get("prompt_budgets"))
+        self.memory  = ConversationMemory(
+            self.lm.chat,
+            max_turns     = cfg["memory_turns"],
+            summary_words = cfg["memory_summary_words"]
+        )
+        self.vision_cache = VisionCache(
+            max_entries  = cfg["vision_cache_size"],
+            ttl          = cfg["vision_cache_ttl"],
+            max_distance = cfg["vision_cache_distance"],
+            path         = os.path.join(profile_cache_dir(profile_name), "vision_cache.json")
+        ) if cfg.get("vision_cache", True) else None
+        self.out     = open(args.out, "a", encoding="utf-8") if args.out else None
+        self.counts  = {"frames": 0, "skipped": 0, "cached": 0, "described": 0, "summaries": 0}
+
+    def describe(self, frame) -> tuple:
+        """Vision description of one frame: (text, from_cache)."""
+        key = VisionCache.prompt_key(self.system, self.shot, "full")
+        hashes = None
+        if self.vision_cache is not None:
+            hashes = [dhash(frame)]
+            cached = self.vision_cache.lookup(hashes, key)
+            if cached is not None:
+                return cached, True
+        text = self.lm.send_images_data(self.encoder.encode(frame), self.system, self.shot)
+        if hashes:
+            self.vision_cache.store(hashes, key, text)
+        return text, False
+
+    def run(self, frames):
+        """
+        Max-throughput mode keeps up to --concurrency vision calls in flight;
+        --realtime paces frames by their timestamps (one call at a time, like
+        the live commentary loop). Results are emitted in frame order.
+        """
+        pool    = ThreadPoolExecutor(1 if self.args.realtime else self.args.concurrency)
+        pending = []   # [(ts, name, gate token, future)], in frame order
+        batch   = []
+        start   = time.monotonic()
+
+        def drain(limit: int):
+            # emit finished results in order; wait on the oldest only while
+            # more than `limit` frames are pending
+            while pending and (len(pending) > limit or pending[0][3].done()):
+                ts, name, token, fut = pending.pop(0)
+                try:
+                    text, cached = fut.result()
+                except Exception as e:
+                    log.warning("%s: vision call failed: %s", name, e)
+                    continue
+                # only a described frame becomes the change baseline
+                self.gate.mark_sent(token)
+                self.counts["cached" if cached else "described"] += 1
+                self.emit({"type": "description", "frame": name, "t": round(ts, 3),
+                           "cached": cached, "text": text})
+                self.rag.enqueue_text({"text": text, "type": "screenshot"})
+                self.memory.add_note(f"Screen: {text}")
+                batch.append(text)
+                if len(batch) >= self.args.batch:
+                    self.summarize(batch, ts)
+                    batch.clear()
+
+        for ts, frame, name in frames:
+            self.counts["frames"] += 1
+            if self.args.realtime:
+                delay = start + ts / self.args.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if not self.gate.should_send(frame):
+                self.counts["skipped"] += 1
+                continue
+            pending.append((ts, name, self.gate.last_token, pool.submit(self.describe, frame)))
+            # bounded look-ahead: at most 2× concurrency frames pending, so
+            # the pool stays busy while the oldest result is awaited
+            drain(0 if self.args.realtime else 2 * self.args.concurrency - 1)
+
+        drain(0)
+        if batch:
+            self.summarize(batch, None)
+        pool.shutdown()
+
+    def summarize(self, descriptions: list, ts):
+        if self.args.ingest_only or not self.template:
+            return
+        hits = []
+        if "{rag_context}" in self.template:
+            try:
+                hits = self.rag.query(descriptions[-1])
+            except Exception as e:
+                log.warning("RAG query failed: %s", e)
+        system, _    = self.memory.context(self.system)
+        system, user = self.prompts.build(system, self.template, descriptions, hits)
+        try:
+            with span("replay_summary"):
+                text = self.lm.chat(system, user)
+        except Exception as e:
+            log.warning("summary failed: %s", e)
+            return
+        self.counts["summaries"] += 1
+        self.emit({"type": "commentary", "t": ts if ts is None else round(ts, 3), "text": text})
+        self.rag.enqueue_text({"text": text, "type": "commentary"})
+        self.memory.add_note(f"Advisor: {text}")
+        self.memory.fold()   # headless: nothing to keep responsive, fold inline
+
+    def emit(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.out is not None:
+            self.out.write(line + "\n")
+            self.out.flush()
+        else:
+            print(line)
+
+    def close(self):
+        self.rag.flush(timeout=60)
+        if self.rag.local_index is not None:
+            self.rag.local_index.save()
+        if self.vision_cache is not None:
+            self.vision_cache.save()
+        if self.out is not None:
+            self.out.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="directory of frames or a video file")
+    ap.add_argument("--profile", help="profile name (default: selected_profile)")
+    ap.add_argument("--fps", type=float, default=1.0,
+                    help="capture rate the frames in a directory were recorded at")
+    ap.add_argument("--sample-fps", type=float, default=1.0,
+                    help="frames per second to take from a video (0 = every frame)")
+    ap.add_argument("--realtime", action="store_true",
+                    help="pace frames by their timestamps instead of max throughput")
+    ap.add_argument("--speed", type=float, default=1.0, help="realtime speed-up factor")
+    ap.add_argument("--concurrency", type=int, default=2,
+                    help="vision calls in flight in max-throughput mode")
+    ap.add_argument("--batch", type=int, default=None,
+                    help="descriptions per commentary summary (default: commentary_batch)")
+    ap.add_argument("--ingest-only", action="store_true",
+                    help="only describe frames and ingest them into RAG")
+    ap.add_argument("--threshold", type=float, default=None,
+                    help="change-gate threshold (default: change_threshold)")
+    ap.add_argument("--out", help="append JSONL results here instead of stdout")
+    args = ap.parse_args(argv)
+
+    cfg = load_settings()
+    setup_logging(cfg)
+    metrics = metrics_from_settings(cfg)
+    transport_from_settings(cfg)
+
+    name    = args.profile or cfg["selected_profile"]
+    profile = load_profile(name)
+    cfg.update({k: v for k, v in profile.items() if k in cfg})
+    if args.threshold is not None:
+        cfg["change_threshold"] = args.threshold
+    args.batch = args.batch or int(cfg.get("commentary_batch", 3))
+
+    if os.path.isdir(args.source):
+        frames = frames_from_dir(args.source, args.fps)
+    else:
+        frames = frames_from_video(args.source, args.sample_fps)
+
+    replay = Replay(cfg, profile, name, args)
+    start  = time.perf_counter()
+    try:
+        replay.run(frames)
+    finally:
+        replay.close()
+        elapsed = time.perf_counter() - start
+        c = replay.counts
+        log.info("replayed %d frames in %.1fs (%.2f frames/s): %d skipped, "
+                 "%d cached, %d described, %d summaries",
+                 c["frames"], elapsed, c["frames"] / elapsed if elapsed else 0.0,
+                 c["skipped"], c["cached"], c["described"], c["summaries"])
+        if cfg.get("metrics_summary_path"):
+            metrics.write_jsonl(cfg["metrics_summary_path"])
+        metrics.close()
+
+
+if __name__ == "__main__":
+    main()
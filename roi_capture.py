@@ -0,0 +1,50 @@
+# roi_capture.py
+
+from PIL import Image
+
+MOSAIC_PAD = 4   # gap between stacked crops in the mosaic, in px
+
+CAPTURE_MODES = ("full", "rois", "mosaic")
+
+def roi_regions(monitor: dict, rois: dict) -> list[tuple[str, dict]]:
+    """
+    Convert monitor-relative ROIs (as edited in ROIManager) into absolute,
+    integer mss regions, clamped to the monitor. Empty regions are dropped.
+    """
+    regions = []
+    for name, roi in rois.items():
+        left   = max(0, int(roi["left"]))
+        top    = max(0, int(roi["top"]))
+        right  = min(monitor["width"],  int(roi["left"] + roi["width"]))
+        bottom = min(monitor["height"], int(roi["top"]  + roi["height"]))
+        if right - left < 1 or bottom - top < 1:
+            continue
+        regions.append((name, {
+            "left":   monitor["left"] + left,
+            "top":    monitor["top"]  + top,
+            "width":  right - left,
+            "height": bottom - top
+        }))
+    return regions
+
+def grab_rois(sct, monitor: dict, rois: dict) -> list[tuple[str, object]]:
+    """Grab only the ROI rectangles. Returns [(name, ScreenShot), ...]."""
+    return [(name, sct.grab(region)) for name, region in roi_regions(monitor, rois)]
+
+def build_mosaic(crops, pad: int = MOSAIC_PAD) -> Image.Image:
+    """Stack the crops top to bottom into one RGB image."""
+    width  = max(shot.width for _, shot in crops)
+    height = sum(shot.height for _, shot in crops) + pad * (len(crops) - 1)
+    mosaic = Image.new("RGB", (width, height))
+    y = 0
+    for _, shot in crops:
+        mosaic.paste(Image.frombytes("RGB", shot.size, shot.rgb), (0, y))
+        y += shot.height + pad
+    return mosaic
+
+def describe_crops(crops, mosaic: bool) -> str:
+    """Prompt note so the model knows what each crop is."""
+    names = ", ".join(name for name, _ in crops)
+    if mosaic:
+        return f"The image is a stack of game screen regions, top to bottom: {names}."
+    return f"The images are crops of game screen regions, in order: {names}."
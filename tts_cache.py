@@ -0,0 +1,117 @@
+# tts_cache.py
+
+import os
+import json
+import logging
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+class TTSCache:
+    """
+    Content-addressed WAV cache: a small in-memory LRU in front of a
+    larger on-disk LRU. Keys are hashes of the normalized text plus the
+    voice settings, so a hit never needs the TTS server.
+    """
+    def __init__(self, cache_dir: str = "tts_cache",
+                 max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir        = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes   = max_disk_bytes
+
+        self._mem        = OrderedDict()   # key → wav bytes
+        self._mem_bytes  = 0
+        self._disk       = OrderedDict()   # key → file size, oldest first
+        self._disk_bytes = 0
+        self._lock       = threading.Lock()
+
+        self.hits = self.disk_hits = self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".wav"):
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((st.st_mtime, name[:-4], st.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+
+    @staticmethod
+    def key(text: str, voice: dict = None) -> str:
+        norm = " ".join(unicodedata.normalize("NFC", text).split())
+        blob = json.dumps({"text": norm, "voice": voice or {}}, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def get(self, key: str):
+        with self._lock:
+            wav = self._mem.get(key)
+            if wav is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return wav
+            if key in self._disk:
+                try:
+                    with open(self._path(key), "rb") as f:
+                        wav = f.read()
+                    os.utime(self._path(key))
+                except OSError:
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, wav)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return wav
+            self.misses += 1
+            return None
+
+    def put(self, key: str, wav: bytes):
+        with self._lock:
+            self._remember(key, wav)
+            if not self.cache_dir or key in self._disk:
+                return
+            try:
+                with open(self._path(key), "wb") as f:
+                    f.write(wav)
+            except OSError as e:
+                log.warning("write failed: %s", e)
+                return
+            self._disk[key] = len(wav)
+            self._disk_bytes += len(wav)
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._path(old))
+                except OSError:
+                    pass
+
+    def _remember(self, key: str, wav: bytes):
+        if key in self._mem:
+            self._mem.move_to_end(key)
+            return
+        self._mem[key] = wav
+        self._mem_bytes += len(wav)
+        while self._mem_bytes > self.max_memory_bytes and len(self._mem) > 1:
+            _, old = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits":       self.hits,
+            "disk_hits":  self.disk_hits,
+            "misses":     self.misses,
+            "hit_rate":   self.hits / total if total else 0.0,
+            "mem_bytes":  self._mem_bytes,
+            "disk_bytes": self._disk_bytes
+        }
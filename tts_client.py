@@ -1,19 +1,37 @@
 # tts_client.py
 
-import requests
+from http_transport import get_transport
+from metrics import span
 
 class TTSClient:
-    def __init__(self, url: str):
-        self.url = url.rstrip("/")
+    def __init__(self, url: str, voice: dict = None, cache=None, transport=None):
+        self.url   = url.rstrip("/")
+        self.voice = voice or {}    # extra /tts fields (voice, speed, …)
+        self.cache = cache          # optional TTSCache
+        self.http  = transport or get_transport()
 
     def generate_wav(self, text: str) -> bytes:
         """
         Send text to the AI server's /tts endpoint and return raw WAV bytes.
+        Cache hits skip the server entirely.
         """
-        resp = requests.post(
-            f"{self.url}/tts",
-            json={"text": text},
-            timeout=60
-        )
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(text, self.voice)
+            wav = self.cache.get(key)
+            if wav is not None:
+                return wav
+
+        with span("tts_synth"):
+            resp = self.http.post(
+                f"{self.url}/tts",
+                json={"text": text, **self.voice},
+                timeout=60,
+                # a read timeout may mean synthesis is still running on the
+                # server; only retry if the request never got there
+                retry_connect=True
+            )
         resp.raise_for_status()
+        if key is not None:
+            self.cache.put(key, resp.content)
         return resp.content
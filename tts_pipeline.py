@@ -0,0 +1,101 @@
+# tts_pipeline.py
+
+import io
+import re
+import queue
+import logging
+import threading
+import wave
+
+import simpleaudio as sa
+
+from metrics import span
+
+log = logging.getLogger(__name__)
+
+# End of a sentence: terminal punctuation followed by whitespace, or a line break
+_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _BOUNDARY.split(text) if s and s.strip()]
+
+
+class SpeechStream:
+    """
+    Collects streamed tokens and hands each sentence to the pipeline as
+    soon as it is complete. Call close() when the reply is finished.
+    """
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+        self._buf      = ""
+
+    def feed(self, token: str):
+        self._buf += token
+        last = None
+        for last in _BOUNDARY.finditer(self._buf):
+            pass
+        if last is None:
+            return
+        done, self._buf = self._buf[:last.end()], self._buf[last.end():]
+        for sentence in split_sentences(done):
+            self._pipeline.enqueue(sentence)
+
+    def close(self):
+        if self._buf.strip():
+            self._pipeline.enqueue(self._buf.strip())
+        self._buf = ""
+
+
+class SpeechPipeline:
+    """
+    Sentence-pipelined TTS: one thread synthesizes sentence N+1 while
+    another plays sentence N straight from memory.
+
+    `max_ahead` bounds how many synthesized sentences may wait for playback.
+    """
+    def __init__(self, tts, on_error=None, max_ahead: int = 2):
+        self.tts       = tts
+        self.on_error  = on_error
+        self._text_q   = queue.Queue()
+        self._audio_q  = queue.Queue(maxsize=max_ahead)
+
+        threading.Thread(target=self._synth_loop, daemon=True).start()
+        threading.Thread(target=self._play_loop,  daemon=True).start()
+
+    def say(self, text: str):
+        """Speak a complete reply."""
+        for sentence in split_sentences(text):
+            self.enqueue(sentence)
+
+    def stream(self) -> SpeechStream:
+        """Speak a reply while it is still being generated."""
+        return SpeechStream(self)
+
+    def enqueue(self, sentence: str):
+        self._text_q.put(sentence)
+
+    def _synth_loop(self):
+        while True:
+            sentence = self._text_q.get()
+            try:
+                self._audio_q.put(self.tts.generate_wav(sentence))
+            except Exception as e:
+                self._report(e)
+
+    def _play_loop(self):
+        while True:
+            wav_bytes = self._audio_q.get()
+            try:
+                with wave.open(io.BytesIO(wav_bytes)) as w, span("tts_playback"):
+                    frames = w.readframes(w.getnframes())
+                    sa.play_buffer(
+                        frames, w.getnchannels(), w.getsampwidth(), w.getframerate()
+                    ).wait_done()
+            except Exception as e:
+                self._report(e)
+
+    def _report(self, e: Exception):
+        if self.on_error:
+            self.on_error(e)
+        else:
+            log.warning("%s: %s", type(e).__name__, e)
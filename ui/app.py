@@ -1,28 +1,43 @@
 # ui/app.py
 
 import os
+import logging
 import threading
-import tempfile
 import tkinter as tk
-import simpleaudio as sa
+from concurrent.futures import CancelledError, Future
 import keyboard
-import mss
-import queue
 import time
-from mss.tools import to_png
 from config import (
     load_settings, save_settings,
-    load_profile, save_profile, list_profiles
+    load_profile, save_profile, list_profiles, profile_cache_dir, setup_logging
 )
 from lm_client import LMClient
 from rag_client import RAGClient
 from tts_client import TTSClient
-
-from ui.widgets import truncate, add_bubble
+from tts_cache import TTSCache
+from http_transport import transport_from_settings
+from metrics import metrics_from_settings
+from tts_pipeline import SpeechPipeline
+from frame_gate import FrameChangeGate
+from roi_capture import build_mosaic, describe_crops
+from capture_service import CaptureService
+from image_encoder import ImageEncoder
+from encode_pool import EncodePool
+from vision_cache import VisionCache, dhash
+from local_index import LocalIndex
+from prompt_builder import PromptAssembler
+from conversation_memory import ConversationMemory
+from async_clients import get_loop, AsyncLMClient, AsyncRAGClient, AsyncTTSClient
+from lm_scheduler import LMScheduler, INTERACTIVE, SCREENSHOT, COMMENTARY, BACKGROUND
+
+from ui.widgets import truncate, add_bubble, update_bubble
+from ui.dispatcher import UIDispatcher
 from ui.preview import PreviewCanvas
 from ui.frames import build_config_frame, build_preview_frame, build_chat_frame
 from ui.roi_manager import ROIManager
 
+log = logging.getLogger(__name__)
+
 
 class DanzarAIApp(tk.Tk):
     def __init__(self, cfg, lm: LMClient, rag: RAGClient, tts: TTSClient):
@@ -31,8 +46,28 @@ class DanzarAIApp(tk.Tk):
         self.lm  = lm
         self.rag = rag
         self.tts = tts
-        # Queue for text-to-speech playback
-        self._tts_queue = queue.Queue()
+        # Worker threads hand all widget updates to the Tk thread through this
+        self.ui  = UIDispatcher(self, fps=cfg.get("ui_fps", 30))
+        # Async views of the clients, all running on one background loop
+        self.aio  = get_loop()
+        self.alm  = AsyncLMClient(lm,  limit=cfg.get("lm_concurrency", 2))
+        self.arag = AsyncRAGClient(rag, limit=cfg.get("rag_concurrency", 2))
+        self.atts = AsyncTTSClient(tts, limit=1)
+        # Every LM call goes through one priority scheduler (chat first)
+        self.sched = LMScheduler(self.aio, max_inflight=cfg.get("lm_concurrency", 2))
+        # Sentence-pipelined text-to-speech
+        self.speech = SpeechPipeline(
+            tts, on_error=lambda e: add_bubble(self.bubble_frame, f"[TTS Error: {e}]", False)
+        )
+        # Last few chat turns verbatim + a running summary of everything older
+        self.memory = ConversationMemory(
+            lambda system, user: self.sched.submit(
+                lambda: self.alm.chat(system, user), BACKGROUND).result(),
+            max_turns     = cfg.get("memory_turns", 6),
+            summary_words = cfg.get("memory_summary_words", 200),
+            fold_lines    = cfg.get("memory_fold_lines", 12),
+            fold_age      = cfg.get("memory_fold_age", 120)
+        )
 
         # Ensure config defaults
         self.cfg.setdefault("ocr_rois", {})
@@ -40,6 +75,28 @@ class DanzarAIApp(tk.Tk):
         self.cfg.setdefault("commentary_interval", 5)
         self.cfg.setdefault("commentary_batch", 1)
         self.cfg.setdefault("monitor_index", 1)
+        self.cfg.setdefault("change_threshold", 3.0)
+        self.cfg.setdefault("capture_mode", "full")
+        self.cfg.setdefault("stream_responses", True)
+        self.cfg.setdefault("capture_ring_size", 4)
+        self.cfg.setdefault("encode_processes", 2)
+
+        # Commentary only sends frames that changed since the last one sent
+        self.change_gate = FrameChangeGate(self.cfg["change_threshold"])
+        # commentary ticks with a frame still in flight (see _commentary_tick)
+        self._commentary_slots = threading.BoundedSemaphore(2)
+        # Resize/compress frames for the configured vision model, in worker
+        # processes when encode_processes > 0 (keeps the GIL free for Tk)
+        self.encoder = ImageEncoder.for_model(
+            self.cfg.get("model_name", ""), self.cfg.get("image_encoders")
+        )
+        if self.cfg.get("encode_processes", 0) > 0:
+            self.encoder = EncodePool(self.encoder.settings,
+                                      processes=self.cfg["encode_processes"])
+        # Fills commentary templates within the model's context budget
+        self.prompts = PromptAssembler.for_model(
+            self.cfg.get("model_name", ""), self.cfg.get("prompt_budgets")
+        )
 
         # Tk Variables — must come before frame building
         self.profile_var   = tk.StringVar(value=self.cfg["selected_profile"])
@@ -47,9 +104,15 @@ class DanzarAIApp(tk.Tk):
         self.batch_var     = tk.StringVar(value=str(self.cfg["commentary_batch"]))
         self.show_rois_var = tk.BooleanVar(value=True)
 
+        # One long-lived capture thread + preallocated frame ring
+        self.capture = CaptureService(
+            self.cfg["monitor_index"], capacity=self.cfg["capture_ring_size"],
+            shared=isinstance(self.encoder, EncodePool)
+        )
+
         # Build monitor list and var
         mons = [f"{i}: {m['width']}x{m['height']}"
-                for i, m in enumerate(mss.mss().monitors) if i>0]
+                for i, m in enumerate(self.capture.monitors) if i>0]
         idx = self.cfg["monitor_index"]
         default_mon = next((s for s in mons if s.startswith(f"{idx}:")), mons[0])
         self.mon_var = tk.StringVar(value=default_mon)
@@ -66,38 +129,214 @@ class DanzarAIApp(tk.Tk):
 
         # Populate prompts for initial profile
         self._load_profile()
+        self._refresh_settings()
 
         # ROI manager listens for preview updates
-        self.roi_mgr = ROIManager(self.preview, self.cfg)
+        self.roi_mgr = ROIManager(self.preview, self.cfg, monitors=self.capture.monitors)
         # Redraw when show_rois toggles
         self.show_rois_var.trace_add("write", lambda *a: self.preview.update_preview())
 
         # Start background threads
         threading.Thread(target=self._setup_hotkeys, daemon=True).start()
-        threading.Thread(target=self._tts_player_loop, daemon=True).start()
         threading.Thread(target=self._commentary_loop, daemon=True).start()
+        threading.Thread(target=self._autosave_loop, daemon=True).start()
     # ─── Manual Controls ─────────────────────────────────────────────
 
-    def send_screenshot(self):
-        """Grab screen → PNG → LM vision call → display."""
+    def _grab_frames(self):
+        """
+        Grab the monitor, or only the profile's ROIs when capture_mode is
+        "rois"/"mosaic". Returns [(name, frame), ...] where a full-monitor
+        frame is a capture-ring Frame (zero-copy BGRA view) and ROI crops
+        are mss ScreenShots.
+        """
+        idx = self.cfg["monitor_index"]
+        if self.cfg.get("capture_mode", "full") != "full" and self.roi_mgr.rois:
+            crops = self.capture.grab_rois(self.roi_mgr.rois, idx)
+            if crops:
+                return crops
+        return [("screen", self.capture.grab(idx))]
+
+    def _encode_frames(self, crops):
+        """Turn grabbed frames into (encoded_images, prompt_note) for the LM."""
+        if len(crops) == 1 and crops[0][0] == "screen":
+            return self.encoder.encode(crops[0][1]), ""
+        if self.cfg.get("capture_mode") == "mosaic":
+            return (self.encoder.encode(build_mosaic(crops), allow_tiles=False),
+                    describe_crops(crops, mosaic=True))
+        images = [img for _, shot in crops
+                  for img in self.encoder.encode(shot, allow_tiles=False)]
+        return images, describe_crops(crops, mosaic=False)
+
+    def _cached_description(self, crops, system: str, user: str):
+        """
+        Perceptual-hash lookup for these frames + prompt.
+        Returns (hashes, prompt_key, cached_text_or_None).
+        """
+        if self.vision_cache is None:
+            return None, None, None
+        hashes = [dhash(frame) for _, frame in crops]
+        key    = VisionCache.prompt_key(system, user, self.cfg.get("capture_mode", "full"))
+        return hashes, key, self.vision_cache.lookup(hashes, key)
+
+    def _remember_description(self, hashes, prompt_key, text: str):
+        if self.vision_cache is not None and hashes:
+            self.vision_cache.store(hashes, prompt_key, text)
+
+    def _describe_preemptible(self, images, system: str, user: str, tries: int = 3) -> Future:
+        """
+        A COMMENTARY vision call whose frame survives preemption: streamed, so
+        a preempting chat really stops it on the LM server, and resubmitted
+        (up to `tries` times in all) instead of failing with CancelledError.
+        """
+        result = Future()
+
+        def submit(left):
+            job = self.sched.submit(
+                lambda: self.alm.send_images_data(images, system, user, stream=True),
+                COMMENTARY)
+            job.add_done_callback(lambda job: done(job, left - 1))
+
+        def done(job, left):
+            if job.cancelled():
+                if left > 0:
+                    log.debug("batch frame preempted, resubmitting")
+                    submit(left)
+                else:
+                    result.set_exception(RuntimeError("preempted too often"))
+            elif job.exception() is not None:
+                result.set_exception(job.exception())
+            else:
+                result.set_result(job.result())
+
+        submit(tries)
+        return result
+
+    def _ingest(self, text: str, kind: str):
+        """Queue text for RAG ingestion; the write happens in the background."""
+        if text:
+            self.rag.enqueue_text({"text": text, "type": kind})
+
+    def _ui_settings(self) -> dict:
+        """Prompts and commentary schedule as plain values. Tk thread only."""
+        def text(label):
+            return self.text_widgets[label].get("1.0", "end").strip()
+        try:
+            interval = float(self.interval_var.get())
+        except ValueError:
+            interval = None
+        try:
+            batch = int(self.batch_var.get())
+        except ValueError:
+            batch = 1
+        return {
+            "system":     text("System Prompt:"),
+            "screenshot": text("Screenshot Prompt:"),
+            "commentary": text("Commentary Prompt:"),
+            "interval":   interval,
+            "batch":      batch,
+        }
+
+    def _refresh_settings(self):
+        # Tk thread; workers only read the snapshot
+        self._settings = self._ui_settings()
+
+    def send_screenshot(self, crops=None, priority: int = SCREENSHOT, key: str = None,
+                        settings: dict = None) -> bool:
+        """
+        Grab screen (or ROIs) → encode → LM vision call → display. Returns True
+        on success. `priority`/`key` are passed to the LM scheduler. Visually
+        equivalent screens are answered from the vision cache without calling
+        the LM. Off the Tk thread, pass `settings` (a _ui_settings() snapshot).
+        """
         try:
-            with mss.mss() as sct:
-                mon = sct.monitors[self.cfg["monitor_index"]]
-                img = sct.grab(mon)
-            png_bytes = to_png(img.rgb, img.size)
-            add_bubble(self.bubble_frame, "📸 Screenshot sent", True)
-
-            system = self.text_widgets["System Prompt:"].get("1.0", "end").strip()
-            user   = self.text_widgets["Screenshot Prompt:"].get("1.0", "end").strip()
-            resp   = self.lm.send_screenshot_data(png_bytes, system, user)
+            if settings is None:
+                settings = self._ui_settings()
+            if crops is None:
+                crops = self._grab_frames()
+            system = settings["system"]
+            user   = settings["screenshot"]
+
+            hashes, prompt_key, cached = self._cached_description(crops, system, user)
+            if cached is None:
+                images, note = self._encode_frames(crops)
+                if note:
+                    user = f"{user}\n{note}"
         except Exception as e:
             resp = f"[Screenshot Error: {e}]"
+            add_bubble(self.bubble_frame, resp, False)
+            self.speech.say(resp)
+            return False
+
+        if cached is not None:
+            add_bubble(self.bubble_frame, "📸 Screenshot (cached description)", True)
+            add_bubble(self.bubble_frame, cached, False)
+            self.speech.say(cached)
+            return True
+
+        add_bubble(self.bubble_frame, "📸 Screenshot sent", True)
+        resp, ok = self._reply(
+            lambda on_token, stream: self.alm.send_images_data(
+                images, system, user, on_token=on_token, stream=stream),
+            "Screenshot",
+            priority, key
+        )
+        if ok:
+            self._remember_description(hashes, prompt_key, resp)
+            self._ingest(resp, "screenshot")
+            self.memory.add_note(f"Screen: {resp}")
+        return ok
+
+    def _reply(self, request, error_tag: str, priority: int = INTERACTIVE, key: str = None):
+        """
+        Run one LM request through the scheduler, show the answer in a single
+        AI bubble and speak it. `request(on_token, stream)` builds the
+        coroutine. With stream_responses on, the bubble appears with the
+        first token and grows as tokens arrive, and each finished sentence
+        goes to TTS while the rest is still generating. A job cancelled
+        before producing anything (superseded, preempted) shows nothing.
+        Blocks the calling (worker) thread. Returns (text, ok).
+        """
+        stream = bool(self.cfg.get("stream_responses", False))
+        speech = self.speech.stream() if stream else None
+        state  = {"text": "", "lbl": None}
+
+        def on_token(token):
+            state["text"] += token
+            speech.feed(token)
+            # updates coalesce in the UI dispatcher: one redraw per frame
+            if state["lbl"] is None:
+                state["lbl"] = add_bubble(self.bubble_frame, state["text"], False)
+            else:
+                update_bubble(self.bubble_frame, state["lbl"], state["text"])
 
-        add_bubble(self.bubble_frame, resp, False)
-        # ← enqueue for TTS
-        self._tts_queue.put(resp)
-
-        add_bubble(self.bubble_frame, resp, False)
+        job = self.sched.submit(
+            lambda: request(on_token if stream else None, stream), priority, key
+        )
+        cancelled = False
+        try:
+            text, ok = job.result(), True
+        except CancelledError:
+            text, ok, cancelled = state["text"] + " …[cancelled]", False, True
+        except Exception as e:
+            text, ok = f"[{error_tag} Error: {e}]", False
+            if speech:
+                speech.feed(f"\n{text}")
+
+        if cancelled and not state["text"]:
+            log.debug("%s request cancelled before it started", error_tag)
+            return "", False
+        if not stream:
+            add_bubble(self.bubble_frame, text, False)
+            if not cancelled:
+                self.speech.say(text)
+            return text, ok
+        if not cancelled:
+            speech.close()
+        if state["lbl"] is None:
+            add_bubble(self.bubble_frame, text, False)
+        else:
+            update_bubble(self.bubble_frame, state["lbl"], text)
+        return text, ok
 
     def _start_record(self):
         self._recording = True
@@ -114,6 +353,7 @@ class DanzarAIApp(tk.Tk):
     def _load_profile(self):
         profile = self.profile_var.get()
         data    = load_profile(profile)
+        self.memory.clear()   # a new game starts a new conversation
 
         # Remap keys if needed
         if "system" in data:
@@ -124,6 +364,8 @@ class DanzarAIApp(tk.Tk):
             data["commentary_prompt"] = data.pop("commentary")
 
         self.cfg.update(data)
+        self._open_vision_cache(profile)
+        self._open_local_index(profile)
         for lbl, txt in self.text_widgets.items():
             key = lbl.strip(":").lower().replace(" ", "_")
             txt.delete("1.0", tk.END)
@@ -131,6 +373,33 @@ class DanzarAIApp(tk.Tk):
 
         self.preview.update_preview()
 
+    def _open_vision_cache(self, profile):
+        """Switch to the profile's on-disk description cache (saving the old one)."""
+        old = getattr(self, "vision_cache", None)
+        if old is not None:
+            old.save()
+        self.vision_cache = None
+        if self.cfg.get("vision_cache", True):
+            self.vision_cache = VisionCache(
+                max_entries  = self.cfg.get("vision_cache_size", 512),
+                ttl          = self.cfg.get("vision_cache_ttl", 86400),
+                max_distance = self.cfg.get("vision_cache_distance", 4),
+                path         = os.path.join(profile_cache_dir(profile), "vision_cache.json")
+            )
+
+    def _open_local_index(self, profile):
+        """Point the RAG client at the profile's local notes index (saving the old one)."""
+        old = self.rag.local_index
+        if old is not None:
+            old.save()
+        self.rag.local_index = None
+        if self.cfg.get("rag_local_index", True):
+            self.rag.local_index = LocalIndex(
+                path = os.path.join(profile_cache_dir(profile), "rag_index"),
+                dim  = self.cfg.get("rag_local_dim", 512)
+            )
+            self.rag.invalidate_cache()
+
     def _on_save(self):
         prof = self.profile_var.get()
         base = load_profile(prof)
@@ -169,51 +438,63 @@ class DanzarAIApp(tk.Tk):
 
         # 2) clear the entry field if it still holds this text
         try:
-            self.entry.delete(0, tk.END)
+            self.ui.run(self.entry.delete, 0, tk.END)
         except Exception:
             pass
 
-        # 3) perform the LLM call
+        # 3) perform the LLM call off the Tk thread; the reply is displayed +
+        #    spoken as it streams. The scheduler runs it ahead of everything
+        #    else and preempts any commentary still generating.
         system = self.text_widgets["System Prompt:"].get("1.0", "end").strip()
-        try:
-            resp = self.lm.chat(system, txt)
-        except Exception as e:
-            resp = f"[Chat Error: {e}]"
-
-        # 4) display the AI response
-        add_bubble(self.bubble_frame, resp, False)
-        self._tts_queue.put(resp)
+        threading.Thread(target=self._chat_turn, args=(system, txt), daemon=True).start()
+
+    def _chat_turn(self, system: str, txt: str):
+        """One chat exchange with the conversation memory as context."""
+        system, history = self.memory.context(system)
+        resp, ok = self._reply(
+            lambda on_token, stream: self.alm.chat(
+                system, txt, on_token=on_token, stream=stream, history=history),
+            "Chat"
+        )
+        if ok:
+            self.memory.add_turn(txt, resp)
+            self.memory.fold_async()
 
     def _toggle_commentary(self):
+        if not getattr(self, "auto_mode", False):
+            self._refresh_settings()
         self.auto_mode = not getattr(self, "auto_mode", False)
         self.auto_btn.config(text="Stop Commentary" if self.auto_mode else "Commentary Mode")
 
     # ─── Background Workers ───────────────────────────────────────────
 
     def _setup_hotkeys(self):
-        keyboard.add_hotkey('F2', lambda: self.send_screenshot())
+        keyboard.add_hotkey('F2', lambda: self.ui.post(self._screenshot_hotkey))
         keyboard.add_hotkey('F3', lambda: (
             self._start_record() if not getattr(self, "_recording", False)
             else self._stop_record()
         ))
-        keyboard.add_hotkey('F4', lambda: self._toggle_commentary())
+        keyboard.add_hotkey('F4', lambda: self.ui.post(self._toggle_commentary))
         add_bubble(self.bubble_frame,
                    "🎮 Hotkeys: F8=Screenshot, F9=Mic, F10=Commentary",
                    False)
 
-    def _tts_player_loop(self):
+    def _screenshot_hotkey(self):
+        # Tk thread: read the prompts here, do the capture + LM call off it
+        settings = self._ui_settings()
+        threading.Thread(target=self.send_screenshot, kwargs={"settings": settings},
+                         daemon=True).start()
+
+    def _autosave_loop(self):
+        """Persist the vision cache every cache_save_interval s (and at exit), not per store."""
         while True:
-            txt = self._tts_queue.get()
-            try:
-                wav_bytes = self.tts.generate_wav(txt)
-                tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-                tmp.write(wav_bytes); tmp.flush(); tmp.close()
-                sa.WaveObject.from_wave_file(tmp.name).play().wait_done()
-                os.unlink(tmp.name)
-            except Exception as e:
-                add_bubble(self.bubble_frame, f"[TTS Error: {e}]", False)
-            finally:
-                self._tts_queue.task_done()
+            time.sleep(max(1.0, float(self.cfg.get("cache_save_interval", 60))))
+            cache = self.vision_cache
+            if cache is not None:
+                try:
+                    cache.save()
+                except OSError as e:
+                    log.warning("vision cache save failed: %s", e)
 
     def _commentary_loop(self):
         """
@@ -222,95 +503,167 @@ class DanzarAIApp(tk.Tk):
         """
         while True:
             if getattr(self, "auto_mode", False):
-                # read current settings
-                try:
-                    interval = float(self.interval_var.get())
-                except ValueError:
-                    interval = 5.0
-                try:
-                    batch = int(self.batch_var.get())
-                except ValueError:
-                    batch = 1
+                # settings snapshot taken on the Tk thread; refresh it there
+                # so edits apply from the next round
+                settings = self._settings
+                self.ui.post(self._refresh_settings, key="settings")
+                interval = settings["interval"] or 5.0
 
-                for i in range(batch):
+                for i in range(settings["batch"]):
                     if not self.auto_mode:
                         break
-                    self.send_screenshot()
+                    self._commentary_tick(settings)
                     time.sleep(interval)
             else:
                 # avoid busy‐spin when commentary is off
                 time.sleep(0.2)
 
+    def _commentary_tick(self, settings: dict):
+        """Capture one frame and only send it on if the screen changed."""
+        try:
+            crops = self._grab_frames()
+        except Exception as e:
+            add_bubble(self.bubble_frame, f"[Capture Error: {e}]", False)
+            return
+
+        try:
+            self.change_gate.threshold = float(self.cfg.get("change_threshold", 0))
+        except (TypeError, ValueError):
+            self.change_gate.threshold = 0.0
+        if not self.change_gate.should_send([shot for _, shot in crops]):
+            log.debug("frame unchanged (diff=%.2f < %s), skipping",
+                      self.change_gate.last_score, self.change_gate.threshold)
+            return
+        # bounded: one reply generating + one frame queued behind it; with
+        # both busy this frame is skipped (not marked sent, so a later tick
+        # still sees the change)
+        if not self._commentary_slots.acquire(blocking=False):
+            log.debug("commentary still busy, skipping frame")
+            return
+        token = self.change_gate.last_token
+
+        # don't wait for the reply: if this frame is still queued at the next
+        # tick, the scheduler replaces it with the newer one (same key)
+        def send():
+            try:
+                if self.send_screenshot(crops, COMMENTARY, key="commentary",
+                                        settings=settings):
+                    self.change_gate.mark_sent(token)
+            finally:
+                self._commentary_slots.release()
+        threading.Thread(target=send, daemon=True).start()
+        # fold older turns/descriptions into the summary between ticks
+        self.memory.fold_async()
+
     def _run_batch(self):
         """
-        Send `batch` screenshots at `interval` seconds apart,
-        collect their vision descriptions, then call chat() once
-        with all of them as context.
+        Capture `batch` screenshots on a fixed `interval` schedule while their
+        vision descriptions are computed concurrently on the async loop, then
+        call chat() once with all of them as context.
         """
-        def worker(batch, interval):
+        def worker(batch, interval, system_prompt, commentary_tpl, shot_tpl):
             add_bubble(self.bubble_frame,
                        f"🚀 Capturing {batch} screenshots every {interval}s for batch…",
                        False)
 
-            system_prompt = self.text_widgets["System Prompt:"].get("1.0","end").strip()
-            commentary_tpl = self.text_widgets["Commentary Prompt:"].get("1.0","end").strip()
-
-            descriptions = []
-            for i in range(batch):
-                # 1) grab & send screenshot to vision
+            def show(i, job):
                 try:
-                    with mss.mss() as sct:
-                        mon = sct.monitors[self.cfg["monitor_index"]]
-                        img = sct.grab(mon)
-                    png_bytes = to_png(img.rgb, img.size)
-                    desc = self.lm.send_screenshot_data(
-                        png_bytes,
-                        system_prompt,
-                        self.text_widgets["Screenshot Prompt:"].get("1.0","end").strip()
-                    )
+                    desc = job.result()
                 except Exception as e:
                     desc = f"[Vision Error: {e}]"
                 add_bubble(self.bubble_frame, f"[Capture {i+1}] {desc}", False)
-                descriptions.append(desc)
-
-                # wait before the next, unless it’s the last one
-                if i < batch - 1:
-                    time.sleep(interval)
 
-            # 2) build one combined user prompt
-            # e.g. inject all captures into your commentary template
-            combined_captures = "\n\n".join(
-                f"Capture {i+1}: {d}" for i,d in enumerate(descriptions)
+            # 1) capture on schedule; vision calls overlap (bounded by lm_concurrency)
+            jobs  = []
+            start = time.monotonic()
+            for i in range(batch):
+                # absolute deadlines, so spacing doesn't drift with LM latency
+                delay = start + i * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    crops = self._grab_frames()
+                    hashes, prompt_key, cached = self._cached_description(crops, system_prompt, shot_tpl)
+                    if cached is not None:
+                        job = Future()
+                        job.set_result(cached)
+                    else:
+                        images, note = self._encode_frames(crops)
+                        shot_prompt = f"{shot_tpl}\n{note}" if note else shot_tpl
+                        job = self._describe_preemptible(images, system_prompt, shot_prompt)
+                        def remember(job, h=hashes, k=prompt_key):
+                            if not job.cancelled() and job.exception() is None:
+                                self._remember_description(h, k, job.result())
+                                self._ingest(job.result(), "screenshot")
+                        job.add_done_callback(remember)
+                except Exception as e:
+                    add_bubble(self.bubble_frame, f"[Capture {i+1}] [Capture Error: {e}]", False)
+                    continue
+                job.add_done_callback(lambda job, i=i: show(i, job))
+                jobs.append((i, job))
+
+            # the summary starts as soon as the last description lands; failed
+            # captures (already shown by show()) stay out of the prompt and
+            # the conversation memory
+            descriptions = []
+            for i, job in jobs:
+                try:
+                    descriptions.append(job.result())
+                except Exception as e:
+                    log.warning("batch capture %d not described: %s", i + 1, e)
+            if not descriptions:
+                add_bubble(self.bubble_frame, "⚠️ No capture described, batch skipped", False)
+                return
+
+            # 2) build one combined user prompt: captures + RAG notes fill the
+            #    commentary template, trimmed to the model's context budget
+            hits = []
+            if "{rag_context}" in commentary_tpl:
+                try:
+                    hits = self.rag.query(descriptions[-1])
+                except Exception as e:
+                    log.warning("RAG query failed: %s", e)
+            # the session summary rides on the system prompt (no verbatim turns)
+            system_prompt, _ = self.memory.context(system_prompt)
+            system_prompt, user_prompt = self.prompts.build(
+                system_prompt, commentary_tpl, descriptions, hits
             )
-            user_prompt = commentary_tpl.replace("{captures}", combined_captures)
-
-            # 3) single chat call
-            try:
-                reply = self.lm.chat(system_prompt, user_prompt)
-            except Exception as e:
-                reply = f"[Chat Error: {e}]"
-
-            # 4) display + TTS enqueue
-            add_bubble(self.bubble_frame, reply, False)
-            self._tts_queue.put(reply)
+            log.debug("commentary prompt: %s", self.prompts.last_stats)
+
+            # 3) single chat call, displayed + spoken as it streams
+            summary, ok = self._reply(
+                lambda on_token, stream: self.alm.chat(
+                    system_prompt, user_prompt, on_token=on_token, stream=stream),
+                "Chat",
+                COMMENTARY
+            )
+            if ok:
+                self._ingest(summary, "commentary")
+                for d in descriptions:
+                    self.memory.add_note(f"Screen: {d}")
+                self.memory.add_note(f"Advisor: {summary}")
+                self.memory.fold_async()
             add_bubble(self.bubble_frame, "✅ Batch commentary complete", False)
 
-        # parse the spinbox values
-        try:
-            interval = float(self.interval_var.get())
-        except ValueError:
-            interval = 1.0
-        try:
-            batch = int(self.batch_var.get())
-        except ValueError:
-            batch = 1
-
-        threading.Thread(target=worker, args=(batch, interval), daemon=True).start()
+        # read the widgets here (Tk thread); the worker only gets plain values
+        settings = self._ui_settings()
+        interval = settings["interval"] or 1.0
+        threading.Thread(
+            target=worker,
+            args=(settings["batch"], interval, settings["system"],
+                  settings["commentary"], settings["screenshot"]),
+            daemon=True
+        ).start()
 
 
 
 def main():
     cfg = load_settings()
+    setup_logging(cfg)
+    # per-stage latency spans (capture, encode, LM, RAG, TTS, …)
+    metrics = metrics_from_settings(cfg)
+    # LM, RAG and TTS clients all share this pooled transport
+    transport_from_settings(cfg)
 
     lm = LMClient(
         base_url   = cfg["lmstudio_url"].rstrip("/") + "/v1",
@@ -318,16 +671,39 @@ def main():
         model_name = cfg["model_name"]
     )
     rag = RAGClient(
-        add_url   = cfg["rag_add_url"],
-        query_url = cfg["rag_query_url"]
+        add_url         = cfg["rag_add_url"],
+        query_url       = cfg["rag_query_url"],
+        bulk_url        = cfg.get("rag_bulk_url") or None,
+        batch_size      = cfg["rag_batch_size"],
+        flush_interval  = cfg["rag_flush_interval"],
+        max_pending     = cfg["rag_max_pending"],
+        cache_size      = cfg["rag_cache_size"],
+        cache_ttl       = cfg["rag_cache_ttl"],
+        local_min_score = cfg["rag_local_min_score"]
+    )
+    tts = TTSClient(
+        cfg["tts_server_url"],
+        voice = cfg.get("tts_voice"),
+        cache = TTSCache(cfg["tts_cache_dir"], max_disk_bytes=cfg["tts_cache_mb"] * 1024 * 1024)
     )
-    tts = TTSClient(cfg["tts_server_url"])
 
     app = DanzarAIApp(cfg, lm, rag, tts)
     try:
         app.mainloop()
     finally:
         save_settings(cfg)
+        app.bubble_frame.close()
+        rag.flush(timeout=5)
+        if rag.local_index is not None:
+            rag.local_index.save()
+        if app.vision_cache is not None:
+            app.vision_cache.save()
+        if isinstance(app.encoder, EncodePool):
+            app.encoder.close()
+        app.capture.close()
+        if cfg.get("metrics_summary_path"):
+            metrics.write_jsonl(cfg["metrics_summary_path"])
+        metrics.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+# ui/dispatcher.py
+
+import time
+import logging
+import threading
+
+from metrics import observe
+
+log = logging.getLogger(__name__)
+
+
+class UIDispatcher:
+    """
+    The one way worker threads touch Tk. post() only appends to a locked
+    queue; the Tk thread drains it every 1/fps s via after(), so a burst of
+    events (streamed tokens, a batch of capture bubbles) lands in a single
+    tick and Tk does one layout pass for all of it.
+
+    Events posted with a `key` coalesce: while one is still queued, a newer
+    post with the same key replaces its arguments in place (latest wins,
+    original position kept). update_bubble uses this so a reply streaming
+    at 100 tokens/s redraws at most once per tick.
+    """
+    def __init__(self, root, fps: float = 30.0):
+        self.root      = root
+        self.interval  = max(1, int(1000 / fps))
+        self.thread    = threading.current_thread()   # the Tk thread
+        self._lock     = threading.Lock()
+        self._events   = []    # [[fn, args, kwargs, posted_at]]
+        self._keyed    = {}    # key -> its entry in _events
+        self._after_id = None
+        self.counts    = {"posted": 0, "coalesced": 0, "run": 0}
+        self.start()
+
+    def post(self, fn, *args, key=None, **kwargs):
+        """Run fn(*args, **kwargs) on the Tk thread at the next tick. Any thread."""
+        with self._lock:
+            self.counts["posted"] += 1
+            if key is not None:
+                event = self._keyed.get(key)
+                if event is not None:
+                    event[0], event[1], event[2] = fn, args, kwargs
+                    self.counts["coalesced"] += 1
+                    return
+            event = [fn, args, kwargs, time.perf_counter()]
+            self._events.append(event)
+            if key is not None:
+                self._keyed[key] = event
+
+    def run(self, fn, *args, key=None, **kwargs):
+        """Call fn now when already on the Tk thread, else post() it."""
+        if threading.current_thread() is self.thread:
+            return fn(*args, **kwargs)
+        self.post(fn, *args, key=key, **kwargs)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        with self._lock:
+            events, self._events = self._events, []
+            self._keyed.clear()
+        if events:
+            start = time.perf_counter()
+            for fn, args, kwargs, posted in events:
+                try:
+                    fn(*args, **kwargs)
+                except Exception:
+                    log.exception("UI event %r failed", fn)
+            now = time.perf_counter()
+            self.counts["run"] += len(events)
+            observe("ui_tick", (now - start) * 1000, events=len(events))
+            observe("ui_latency", (now - events[0][3]) * 1000)
+        self._after_id = self.root.after(self.interval, self._tick)
@@ -4,7 +4,7 @@ import os
 import json
 import tkinter as tk
 from tkinter import ttk
-from ui.widgets import add_bubble
+from ui.widgets import ChatView
 
 # Theme colors
 DARK_BG       = "#2e2e2e"
@@ -69,20 +69,20 @@ def build_chat_frame(parent, controller):
     """
     Center: chat history + entry + toolbar.
     Returns: chat_canvas, bubble_frame, entry, send_btn, screenshot_btn, mic_btn, auto_btn, batch_btn
+    (bubble_frame is a ChatView; chat_canvas is its Text widget)
     """
     # --- chat display ---
-    outer = tk.Frame(parent, bg=DARK_BG)
-    outer.pack(fill="both", expand=True)
-
-    chat_canvas = tk.Canvas(outer, bg=DARK_BG, highlightthickness=0)
-    scrollbar = tk.Scrollbar(outer, orient="vertical", command=chat_canvas.yview)
-    chat_canvas.configure(yscrollcommand=scrollbar.set)
-    scrollbar.pack(side="right", fill="y")
-    chat_canvas.pack(side="left", fill="both", expand=True)
-
-    bubble_frame = tk.Frame(chat_canvas, bg=DARK_BG)
-    chat_canvas.create_window((0, 0), window=bubble_frame, anchor="nw")
-    bubble_frame.bind("<Configure>", lambda e: chat_canvas.configure(scrollregion=chat_canvas.bbox("all")))
+    cfg = getattr(controller, "cfg", {})
+    bubble_frame = ChatView(
+        parent,
+        max_visible = cfg.get("chat_visible_max", 200),
+        max_history = cfg.get("chat_history_max", 2000),
+        log_path    = cfg.get("chat_log_path"),
+        bg          = DARK_BG,
+        dispatcher  = getattr(controller, "ui", None)
+    )
+    bubble_frame.pack(fill="both", expand=True)
+    chat_canvas = bubble_frame.text
 
     # --- bottom toolbar ---
     toolbar = tk.Frame(parent, bg=PANEL_BG)
@@ -1,5 +1,14 @@
 import tkinter as tk
-from PIL import ImageTk
+from PIL import Image, ImageTk
+
+def make_thumbnail(pil_image, box):
+    """
+    Downscale to fit `box` (w, h) without copying the full-size image first.
+    Safe to call off the Tk thread.
+    """
+    scale = min(box[0] / pil_image.width, box[1] / pil_image.height, 1.0)
+    size  = (max(1, int(pil_image.width * scale)), max(1, int(pil_image.height * scale)))
+    return pil_image.resize(size, Image.BILINEAR, reducing_gap=2.0)
 
 class PreviewCanvas:
     """
@@ -8,6 +17,8 @@ class PreviewCanvas:
     def __init__(self, parent, controller):
         self.canvas = parent
         self.ctrl   = controller
+        # configured canvas size, read once so worker threads can size thumbnails
+        self.box    = (int(parent["width"]), int(parent["height"]))
 
     def show_image(self, pil_image):
         """
@@ -5,14 +5,20 @@ import mss
 HANDLE = 8  # Size of the little resize handle in px
 
 class ROIManager:
-    def __init__(self, canvas, cfg):
+    def __init__(self, canvas, cfg, monitors=None):
         """
-        canvas: the PreviewCanvas instance
-        cfg:    the same config dict your app uses (must contain 'ocr_rois' & 'monitor_index')
+        canvas:   the PreviewCanvas instance
+        cfg:      the same config dict your app uses (must contain 'ocr_rois' & 'monitor_index')
+        monitors: cached mss monitor list (e.g. CaptureService.monitors);
+                  read once here if not given, never per mouse event
         """
         self.canvas = canvas
         self.cfg    = cfg
         self.rois   = cfg.setdefault("ocr_rois", {})
+        if monitors is None:
+            with mss.mss() as sct:
+                monitors = [dict(m) for m in sct.monitors]
+        self.monitors = monitors
 
         # Drag state
         self._drag = {
@@ -37,7 +43,7 @@ class ROIManager:
         self.canvas.delete("handle")
 
         # Scale factors: real‐screen → canvas
-        mon       = mss.mss().monitors[self.cfg.get("monitor_index", 1)]
+        mon       = self.monitors[self.cfg.get("monitor_index", 1)]
         real_w, real_h = mon["width"], mon["height"]
         img_w, img_h   = self.canvas.img.width(), self.canvas.img.height()
         to_canvas_x = img_w/real_w
@@ -95,7 +101,7 @@ class ROIManager:
         dy = ev.y - self._drag["y"]
 
         # Convert canvas‐delta → real‐screen units
-        mon       = mss.mss().monitors[self.cfg.get("monitor_index", 1)]
+        mon       = self.monitors[self.cfg.get("monitor_index", 1)]
         real_w, real_h = mon["width"], mon["height"]
         img_w, img_h   = self.canvas.img.width(), self.canvas.img.height()
         to_real_x = real_w/img_w
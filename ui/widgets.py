@@ -1,22 +1,171 @@
+import os
+import json
+import time
+import itertools
 import tkinter as tk
+from collections import deque
+
+from ui.dispatcher import UIDispatcher
+
+USER_BG = "#005f99"
+AI_BG   = "#4b0082"
 
 def truncate(text: str, max_chars: int) -> str:
     if len(text) <= max_chars:
         return text
     return "…\n" + text[-max_chars:]
 
-def add_bubble(container, text: str, is_user: bool):
-    bg   = "#005f99" if is_user else "#4b0082"
-    side = "e" if is_user else "w"
-    lbl  = tk.Label(
-        container,
-        text=text,
-        bg=bg, fg="white",
-        wraplength=400,
-        justify="left",
-        font=("Consolas", 12),    # <-- bumped from 11→12
-        padx=8, pady=4
-    )
-    lbl.pack(anchor=side, pady=5)
-    container.update_idletasks()
-    container.master.yview_moveto(1.0)
+
+class ChatView(tk.Frame):
+    """
+    Chat history in a single read-only Text widget: one tagged region per
+    message instead of one Label per message. Tk only lays out the lines on
+    screen, and at most `max_visible` messages are kept in the widget (the
+    oldest are dropped as new ones arrive), so adding a bubble costs the same
+    after hours of commentary as it did on the first one.
+
+    Full history is a JSONL log at `log_path`: messages are appended once
+    they scroll out of the widget, the rest on close(), and the file is
+    trimmed to the last `max_history` messages when opened and closed.
+    history() reads it back (plus what is still on screen). Without a
+    log_path only the messages on screen are kept.
+
+    Widget methods must run on the Tk thread; add_bubble/update_bubble go
+    through `ui` (a UIDispatcher) so worker threads can call them too.
+    """
+    def __init__(self, parent, max_visible: int = 200, max_history: int = 2000,
+                 log_path: str = None, bg: str = "#2e2e2e", dispatcher: UIDispatcher = None):
+        super().__init__(parent, bg=bg)
+        self.ui          = dispatcher or UIDispatcher(self)
+        self.max_visible = max_visible
+        self.max_history = max_history
+        self.log_path    = log_path or None
+        self._visible    = deque()    # {"id", "user", "text", "ts"} shown in the widget
+        self._ids        = itertools.count(1)
+        self._scrolling  = False
+
+        self.text = tk.Text(
+            self, bg=bg, fg="white", wrap="word", state="disabled",
+            font=("Consolas", 12), borderwidth=0, highlightthickness=0,
+            padx=8, pady=4, cursor="arrow"
+        )
+        scrollbar = tk.Scrollbar(self, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+
+        # bubble look: coloured block, right-aligned for the user
+        self.text.tag_configure("user", background=USER_BG, justify="right",
+                                lmargin1=120, lmargin2=120, rmargin=8,
+                                spacing1=5, spacing3=5)
+        self.text.tag_configure("ai", background=AI_BG, justify="left",
+                                lmargin1=8, lmargin2=8, rmargin=120,
+                                spacing1=5, spacing3=5)
+        self._trim_log()
+
+    def new_id(self) -> str:
+        """A message id, handed out before the message is drawn (any thread)."""
+        return f"m{next(self._ids)}"
+
+    def append(self, text: str, is_user: bool, msg_id: str = None) -> str:
+        """Append a message; returns its id for replace()."""
+        rec = {"id": msg_id or self.new_id(), "user": is_user, "text": text, "ts": time.time()}
+        self._visible.append(rec)
+        follow = self._at_bottom()
+        self.text.configure(state="normal")
+        self.text.insert("end-1c", text + "\n", ("user" if is_user else "ai", rec["id"]))
+        while len(self._visible) > self.max_visible:
+            self._drop(self._visible.popleft())
+        self.text.configure(state="disabled")
+        if follow:
+            self._follow()
+        return rec["id"]
+
+    def replace(self, msg_id: str, text: str):
+        """Replace a message's text in place (used while a reply streams in)."""
+        rec = next((r for r in reversed(self._visible) if r["id"] == msg_id), None)
+        if rec is None:
+            return   # already scrolled out of the widget
+        rec["text"] = text
+        start, end = self.text.tag_ranges(msg_id)
+        follow = self._at_bottom()
+        self.text.configure(state="normal")
+        self.text.delete(start, end)
+        self.text.insert(start, text + "\n", ("user" if rec["user"] else "ai", msg_id))
+        self.text.configure(state="disabled")
+        if follow:
+            self._follow()
+
+    def clear(self):
+        ids = [r["id"] for r in self._visible]
+        self.close()
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.configure(state="disabled")
+        if ids:
+            self.text.tag_delete(*ids)
+
+    def history(self, limit: int = None) -> list:
+        """Logged messages plus those still on screen, oldest first (no Tk calls)."""
+        records = []
+        if self.log_path is not None and os.path.isfile(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        records += [dict(r) for r in self._visible]
+        return records[-limit:] if limit else records
+
+    def close(self):
+        """Write the messages still in the widget to the log (no Tk calls)."""
+        while self._visible:
+            self._log(self._visible.popleft())
+        self._trim_log()
+
+    def _drop(self, rec: dict):
+        ranges = self.text.tag_ranges(rec["id"])
+        if ranges:
+            self.text.delete("1.0", ranges[1])
+        self.text.tag_delete(rec["id"])
+        self._log(rec)
+
+    def _log(self, rec: dict):
+        if self.log_path is None:
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def _trim_log(self):
+        # keep the on-disk history at max_history messages
+        if self.log_path is None or not os.path.isfile(self.log_path):
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if len(lines) <= self.max_history:
+            return
+        tmp = f"{self.log_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines[-self.max_history:])
+        os.replace(tmp, self.log_path)
+
+    def _at_bottom(self) -> bool:
+        return self._scrolling or self.text.yview()[1] >= 0.999
+
+    def _follow(self):
+        # one scroll-to-end per idle pass, however many messages arrived
+        if not self._scrolling:
+            self._scrolling = True
+            self.after_idle(self._scroll_to_end)
+
+    def _scroll_to_end(self):
+        self._scrolling = False
+        self.text.see("end")
+
+
+def add_bubble(view: ChatView, text: str, is_user: bool) -> str:
+    """Safe from any thread; returns the id at once, the bubble appears next tick."""
+    msg_id = view.new_id()
+    view.ui.run(view.append, text, is_user, msg_id)
+    return msg_id
+
+def update_bubble(view: ChatView, msg_id: str, text: str):
+    """Replace a bubble's text in place (used while a reply streams in)."""
+    view.ui.run(view.replace, msg_id, text, key=("bubble", msg_id))
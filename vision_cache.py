@@ -0,0 +1,127 @@
+# vision_cache.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from frame_gate import gray_thumbnail
+
+HASH_SIZE = 8   # dHash grid → 64-bit hashes
+
+def dhash(frame, size: int = HASH_SIZE) -> int:
+    """
+    64-bit difference hash: block-average the grayscale thumbnail down to
+    size x (size+1) and record whether each cell is brighter than its
+    right-hand neighbour.
+    """
+    thumb = gray_thumbnail(frame)
+    h, w  = thumb.shape
+    rows  = np.linspace(0, h, size + 1).astype(int)[:-1]
+    cols  = np.linspace(0, w, size + 2).astype(int)[:-1]
+    # cells are 10 or 11 px wide: divide the sums by the cell sizes, or a
+    # cell is "brighter" just for having an extra column
+    sums  = np.add.reduceat(np.add.reduceat(thumb, rows, axis=0), cols, axis=1)
+    small = sums / np.outer(np.diff(np.r_[rows, h]), np.diff(np.r_[cols, w]))
+    bits  = (small[:, 1:] > small[:, :-1]).ravel()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class VisionCache:
+    """
+    Vision descriptions keyed by the perceptual hashes of a frame (or of
+    each ROI crop) plus the prompt. Lookups match the closest entry whose
+    total Hamming distance is within `max_distance` bits per hash, so
+    visually equivalent screens hit even if a few pixels moved.
+
+    Entries expire after `ttl` seconds and the least recently used ones are
+    dropped past `max_entries`. With `path`, entries persist as JSON.
+    """
+    def __init__(self, max_entries: int = 512, ttl: float = 24 * 3600,
+                 max_distance: int = 4, path: str = None):
+        self.max_entries  = max_entries
+        self.ttl          = ttl
+        self.max_distance = max_distance
+        self.path         = path
+        self._entries     = OrderedDict()   # id → {"hashes", "prompt", "text", "time"}
+        self._lock        = threading.Lock()
+        self._save_lock   = threading.Lock()
+        self._dirty       = False
+        self.hits = self.misses = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def prompt_key(*prompts: str) -> str:
+        return hashlib.sha1("\x00".join(prompts).encode("utf-8")).hexdigest()
+
+    def lookup(self, hashes: list[int], prompt: str):
+        """Cached description for these hashes + prompt key, or None."""
+        now, best, best_d = time.time(), None, None
+        with self._lock:
+            for eid, e in list(self._entries.items()):
+                if now - e["time"] > self.ttl:
+                    del self._entries[eid]
+                    self._dirty = True
+                    continue
+                if e["prompt"] != prompt or len(e["hashes"]) != len(hashes):
+                    continue
+                d = sum(hamming(a, b) for a, b in zip(e["hashes"], hashes))
+                if d <= self.max_distance * len(hashes) and (best_d is None or d < best_d):
+                    best, best_d = eid, d
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best]["text"]
+
+    def store(self, hashes: list[int], prompt: str, text: str):
+        eid = f"{prompt}:{'-'.join(f'{h:016x}' for h in hashes)}"
+        with self._lock:
+            self._entries[eid] = {
+                "hashes": list(hashes), "prompt": prompt, "text": text, "time": time.time()
+            }
+            self._entries.move_to_end(eid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for eid, e in data.items():
+                self._entries[eid] = e
+
+    def save(self):
+        """Write the cache to `path` (atomically) if anything changed."""
+        if not self.path or not self._dirty:
+            return
+        with self._save_lock:   # autosave thread vs. shutdown
+            with self._lock:
+                data, self._dirty = dict(self._entries), False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries":  len(self._entries),
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }